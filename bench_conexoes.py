@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+BENCH DE CONEXÕES - requests.post avulso x sessão compartilhada com keep-alive
+Mede o custo de handshake TCP+TLS sem gastar tokens (GET no endpoint de modelos)
+"""
+
+import argparse
+import statistics
+import time
+
+import requests
+
+from cliente_openrouter import OPENROUTER_BASE_URL, TIMEOUT_CONEXAO, obter_sessao, fechar_sessao
+
+URL_PADRAO = f"{OPENROUTER_BASE_URL}/models"
+
+
+def medir(funcao_get, url, repeticoes):
+    """Executa GETs sequenciais e retorna a lista de tempos em segundos"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        response = funcao_get(url, timeout=(TIMEOUT_CONEXAO, 30))
+        response.content
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+
+def resumir(nome, tempos):
+    """Mostra média e mediana de uma série de tempos"""
+    media = statistics.mean(tempos) * 1000
+    mediana = statistics.median(tempos) * 1000
+    print(f"   {nome:<22} média {media:8.1f} ms | mediana {mediana:8.1f} ms")
+    return media
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara requests.post avulso com a sessão keep-alive")
+    parser.add_argument("-n", "--repeticoes", type=int, default=20, help="chamadas por modo (padrão: 20)")
+    parser.add_argument("--url", default=URL_PADRAO, help=f"URL a medir (padrão: {URL_PADRAO})")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("⏱️  BENCH DE CONEXÕES - HANDSHAKE TCP+TLS")
+    print("=" * 60)
+    print(f"🌐 URL: {args.url}")
+    print(f"🔁 Repetições: {args.repeticoes}")
+
+    # Aquece DNS e o pool antes de medir
+    obter_sessao().get(args.url, timeout=(TIMEOUT_CONEXAO, 30)).content
+
+    avulso = medir(requests.get, args.url, args.repeticoes)
+    sessao = medir(obter_sessao().get, args.url, args.repeticoes)
+    fechar_sessao()
+
+    print("\n📊 RESULTADO:")
+    media_avulso = resumir("requests avulso", avulso)
+    media_sessao = resumir("sessão keep-alive", sessao)
+
+    economia = media_avulso - media_sessao
+    print(f"\n💡 Economia por chamada: {economia:.1f} ms")
+    print(f"💡 Economia em 1.000 chamadas: {economia:.0f} s")
+
+
+if __name__ == "__main__":
+    main()
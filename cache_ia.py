@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+CACHE DE RESPOSTAS DA IA - Completions salvas em disco, endereçadas pelo conteúdo
+A chave é o hash do payload (modelo + mensagens + parâmetros)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# Configurações (sobrescrevíveis pelo .env)
+CACHE_DIR = Path(os.getenv("CACHE_IA_DIR", Path(__file__).parent / ".cache_ia"))
+CACHE_MAX_DIAS = float(os.getenv("CACHE_IA_MAX_DIAS", "30"))
+CACHE_MAX_MB = float(os.getenv("CACHE_IA_MAX_MB", "500"))
+CACHE_DESATIVADO = os.getenv("CACHE_IA_DESATIVADO", "").strip().lower() in ("1", "true", "s", "sim")
+
+# Campos do payload que não mudam a resposta. max_tokens é só o teto aprendido
+# pelo ORCAMENTO e muda entre execuções; com ele na chave, o mesmo prompt
+# perderia o cache e a cassete gravada. Por isso resposta cortada pelo teto
+# (finish_reason "length") nunca entra no cache
+CAMPOS_IGNORADOS = ("stream", "max_tokens")
+
+# A limpeza varre a pasta inteira, então só roda a cada N gravações
+PODAR_A_CADA = 50
+
+_lock = threading.Lock()
+_gravacoes = 0
+
+
+def chave_cache(payload):
+    """Calcula o hash SHA-256 que identifica o payload"""
+    dados = {k: v for k, v in payload.items() if k not in CAMPOS_IGNORADOS}
+    serializado = json.dumps(dados, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(serializado.encode('utf-8')).hexdigest()
+
+
+def _caminho(chave):
+    """Arquivo do cache para uma chave (subpastas evitam diretórios gigantes)"""
+    return CACHE_DIR / chave[:2] / f"{chave}.json"
+
+
+def _expirado(caminho):
+    """Indica se o arquivo passou da idade máxima"""
+    return time.time() - caminho.stat().st_mtime > CACHE_MAX_DIAS * 86400
+
+
+def truncada(resposta):
+    """Indica se alguma escolha da resposta parou no max_tokens"""
+    return any(escolha.get("finish_reason") == "length" for escolha in resposta.get("choices") or [])
+
+
+def ler(payload):
+    """Retorna a resposta em cache para o payload, ou None"""
+    caminho = _caminho(chave_cache(payload))
+
+    try:
+        if _expirado(caminho):
+            caminho.unlink(missing_ok=True)
+            return None
+
+        with open(caminho, 'r', encoding='utf-8') as f:
+            resposta = json.load(f)
+
+        # Gravada antes desta regra: com teto maior a resposta seria outra
+        if truncada(resposta):
+            caminho.unlink(missing_ok=True)
+            return None
+
+        # Marca uso recente para a remoção por tamanho (LRU)
+        os.utime(caminho, None)
+        return resposta
+    except (OSError, ValueError):
+        return None
+
+
+def gravar(payload, resposta):
+    """Salva a resposta no cache de forma atômica (respostas cortadas ficam de fora)"""
+    global _gravacoes
+
+    if truncada(resposta):
+        return
+
+    caminho = _caminho(chave_cache(payload))
+
+    try:
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = caminho.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(resposta, f, ensure_ascii=False)
+        os.replace(temporario, caminho)
+    except OSError as e:
+        print(f"   ⚠️  Erro ao gravar cache da IA: {e}")
+        return
+
+    with _lock:
+        _gravacoes += 1
+        podar_agora = _gravacoes % PODAR_A_CADA == 0
+
+    if podar_agora:
+        podar()
+
+
+def podar():
+    """Remove entradas expiradas e, se passar do limite de tamanho, as menos usadas
+
+    Retorna (removidos, bytes_restantes).
+    """
+    if not CACHE_DIR.exists():
+        return 0, 0
+
+    removidos = 0
+    entradas = []
+
+    for arquivo in CACHE_DIR.glob("*/*.json"):
+        try:
+            info = arquivo.stat()
+        except OSError:
+            continue
+
+        if time.time() - info.st_mtime > CACHE_MAX_DIAS * 86400:
+            arquivo.unlink(missing_ok=True)
+            removidos += 1
+        else:
+            entradas.append((info.st_mtime, info.st_size, arquivo))
+
+    total = sum(tamanho for _, tamanho, _ in entradas)
+    limite = CACHE_MAX_MB * 1024 * 1024
+
+    # Mais antigos primeiro
+    for _, tamanho, arquivo in sorted(entradas, key=lambda e: e[0]):
+        if total <= limite:
+            break
+        arquivo.unlink(missing_ok=True)
+        total -= tamanho
+        removidos += 1
+
+    return removidos, total
+
+
+if __name__ == "__main__":
+    removidos, restante = podar()
+    print(f"🧹 Cache da IA: {removidos} entradas removidas, {restante / 1024 / 1024:.1f} MB em uso")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+CASSETES DA IA - Grava e reproduz as chamadas ao Open Router
+Permite repetir um lote real de produção como benchmark determinístico:
+
+    OPENROUTER_CASSETE=lote200.jsonl.gz OPENROUTER_CASSETE_MODO=gravar python gerador.py
+    OPENROUTER_CASSETE=lote200.jsonl.gz OPENROUTER_CASSETE_MODO=reproduzir python gerador.py
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+from cache_ia import chave_cache
+
+CASSETE_ARQUIVO = os.getenv("OPENROUTER_CASSETE", "").strip()
+CASSETE_MODO = os.getenv("OPENROUTER_CASSETE_MODO", "").strip().lower()
+
+# Na reprodução, espera a latência gravada (1) ou responde na hora (0)
+CASSETE_LATENCIA = os.getenv("OPENROUTER_CASSETE_LATENCIA", "0").strip().lower() in ("1", "true", "s", "sim")
+
+
+class CasseteNaoEncontrada(Exception):
+    """Payload pedido na reprodução não existe na cassete"""
+
+
+class Cassete:
+    """Arquivo JSONL compactado com um par requisição/resposta por linha
+
+    Cada linha guarda a chave do payload (mesmo hash do cache_ia), o modelo,
+    o status HTTP, a resposta (ou o texto do erro) e a latência medida.
+    Payloads repetidos são reproduzidos na ordem em que foram gravados.
+    """
+
+    def __init__(self, arquivo, modo):
+        self.arquivo = arquivo
+        self.modo = modo
+        self.lock = threading.Lock()
+        self.fitas = defaultdict(deque)
+
+        if self.reproduzindo:
+            self._carregar()
+
+    @property
+    def gravando(self):
+        return bool(self.arquivo) and self.modo == "gravar"
+
+    @property
+    def reproduzindo(self):
+        return bool(self.arquivo) and self.modo == "reproduzir"
+
+    @property
+    def ativa(self):
+        return self.gravando or self.reproduzindo
+
+    def _carregar(self):
+        total = 0
+        with gzip.open(self.arquivo, 'rt', encoding='utf-8') as f:
+            for linha in f:
+                if linha.strip():
+                    registro = json.loads(linha)
+                    self.fitas[registro['chave']].append(registro)
+                    total += 1
+        print(f"📼 Cassete carregada: {total} chamadas de {self.arquivo}")
+
+    def gravar(self, payload, status, resposta=None, texto_erro="", latencia=0.0):
+        """Acrescenta uma chamada à cassete"""
+        registro = {
+            'chave': chave_cache(payload),
+            'modelo': payload.get('model'),
+            'status': status,
+            'latencia': round(latencia, 3),
+            'resposta': resposta,
+            'erro': texto_erro[:2000] if texto_erro else ""
+        }
+        linha = json.dumps(registro, ensure_ascii=False, separators=(',', ':')) + "\n"
+
+        # Cada gravação é um membro gzip separado; gzip.open lê todos em sequência
+        with self.lock:
+            with gzip.open(self.arquivo, 'at', encoding='utf-8') as f:
+                f.write(linha)
+
+    def tem(self, payload):
+        """Indica se o payload foi gravado na cassete"""
+        with self.lock:
+            return bool(self.fitas.get(chave_cache(payload)))
+
+    def reproduzir(self, payload):
+        """Devolve o próximo registro gravado para o payload
+
+        Quando a fita do payload acaba, repete o último registro.
+        """
+        chave = chave_cache(payload)
+        with self.lock:
+            fita = self.fitas.get(chave)
+            if not fita:
+                raise CasseteNaoEncontrada(f"chamada não gravada na cassete (chave {chave[:12]})")
+            registro = fita.popleft() if len(fita) > 1 else fita[0]
+
+        if CASSETE_LATENCIA and registro['latencia']:
+            time.sleep(registro['latencia'])
+
+        return registro
+
+
+CASSETE = Cassete(CASSETE_ARQUIVO, CASSETE_MODO)
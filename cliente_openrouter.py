@@ -0,0 +1,549 @@
+#!/usr/bin/env python3
+"""
+CLIENTE OPEN ROUTER COMPARTILHADO - Sessão HTTP com keep-alive
+Usado por gerador.py, gerador_satelites.py e finalizador_html.py
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from concurrent.futures import TimeoutError as FuturesTimeout
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+# Carrega o .env antes dos módulos que leem configuração na importação
+load_dotenv()
+
+import cache_ia
+from cassete_ia import CASSETE, CasseteNaoEncontrada
+from limitador_taxa import POOL_CHAVES, estimar_tokens
+from orcamento_tokens import ORCAMENTO
+from registro_ia import REGISTRO
+from resiliencia import (DISJUNTOR, HEDGE, HEDGE_ATIVO, JANELA, RETRY_MAX, STATUS_REPETIVEIS,
+                         calcular_espera, registrar_metrica, workers_para_janela)
+from roteador_modelos import ROTEADOR
+
+# Configurações
+# Aponte OPENROUTER_BASE_URL para o servidor_mock.py para testar sem gastar
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1").rstrip("/")
+OPENROUTER_URL = f"{OPENROUTER_BASE_URL}/chat/completions"
+# Conexões keep-alive: pelo menos uma por requisição que a janela AIMD deixa em voo
+TAMANHO_POOL = workers_para_janela(int(os.getenv("OPENROUTER_POOL", "10")))
+TIMEOUT_CONEXAO = 10
+STREAMING_PADRAO = os.getenv("OPENROUTER_STREAMING", "").strip().lower() in ("1", "true", "s", "sim")
+
+_sessao = None
+_lock_sessao = threading.Lock()
+
+
+class ErroOpenRouter(Exception):
+    """Resposta HTTP diferente de 200 retornada pelo Open Router"""
+
+    def __init__(self, status_code, texto="", retry_after=None):
+        super().__init__(f"HTTP {status_code}: {texto[:200]}")
+        self.status_code = status_code
+        self.texto = texto
+        self.retry_after = retry_after
+
+
+class ErroSaidaInvalida(ErroOpenRouter):
+    """Streaming interrompido porque a resposta parcial já se mostrou inválida"""
+
+    def __init__(self, motivo, texto=""):
+        Exception.__init__(self, f"Saída inválida: {motivo}")
+        self.status_code = None
+        self.texto = texto
+        self.retry_after = None
+        self.motivo = motivo
+
+
+class ChamadaCancelada(Exception):
+    """Leitura abandonada porque a outra cópia da chamada (hedge) já respondeu"""
+
+
+class MonitorArtigo:
+    """Acompanha respostas no formato TITLE/DESCRIPTION/ARTICLE durante o streaming
+
+    Mostra título e description assim que chegam e acusa saída quebrada
+    quando o <article> não aparece dentro do limite de caracteres. Com
+    exigir_article=False a resposta segue até o fim, para quem tem fallback
+    para texto sem <article>.
+    """
+
+    def __init__(self, limite_sem_article=4000, mostrar=True, exigir_article=True):
+        self.limite_sem_article = limite_sem_article
+        self.exigir_article = exigir_article
+        self.mostrar = mostrar
+        self.titulo = None
+        self.descricao = None
+        self.viu_article = False
+
+    def __call__(self, texto):
+        if self.titulo is None:
+            match = re.search(r"TITLE:\s*(.+?)\n", texto[:2000], re.IGNORECASE)
+            if match:
+                self.titulo = match.group(1).strip()
+                if self.mostrar:
+                    print(f"   📝 Título recebido: {self.titulo[:80]}")
+
+        if self.descricao is None:
+            match = re.search(r"DESCRIPTION:\s*(.+?)\n", texto[:2000], re.IGNORECASE)
+            if match:
+                self.descricao = match.group(1).strip()
+                if self.mostrar:
+                    print(f"   📝 Description recebida ({len(self.descricao)} caracteres)")
+
+        if self.exigir_article and not self.viu_article and len(texto) > self.limite_sem_article:
+            if "<article" not in texto.lower():
+                return f"nenhum <article> nos primeiros {self.limite_sem_article} caracteres"
+            self.viu_article = True
+
+        return None
+
+
+def obter_sessao():
+    """Retorna a sessão HTTP compartilhada, criando o pool na primeira chamada"""
+    global _sessao
+
+    if _sessao is None:
+        with _lock_sessao:
+            if _sessao is None:
+                sessao = requests.Session()
+                adaptador = HTTPAdapter(pool_connections=TAMANHO_POOL, pool_maxsize=TAMANHO_POOL)
+                sessao.mount("https://", adaptador)
+                sessao.mount("http://", adaptador)
+                _sessao = sessao
+
+    return _sessao
+
+
+def fechar_sessao():
+    """Fecha a sessão compartilhada e libera as conexões abertas"""
+    global _sessao
+
+    with _lock_sessao:
+        if _sessao is not None:
+            _sessao.close()
+            _sessao = None
+
+
+def segundos_retry_after(response, padrao):
+    """Lê o cabeçalho Retry-After (em segundos); usa o padrão se ausente ou em formato de data"""
+    if "Retry-After" not in response.headers:
+        return padrao
+    try:
+        return max(0.0, float(response.headers.get("Retry-After", "")))
+    except ValueError:
+        return padrao
+
+
+def erro_repetivel(erro):
+    """Indica se vale tentar de novo: falhas de rede e status transitórios"""
+    if isinstance(erro, ErroSaidaInvalida):
+        return False
+    if isinstance(erro, ErroOpenRouter):
+        return erro.status_code in STATUS_REPETIVEIS
+    return isinstance(erro, requests.RequestException)
+
+
+def chamar_chat(payload, headers, timeout=120, usar_cache=True, streaming=None, parar_em=None, validar=None, etapa=None, slug=None):
+    """Envia o payload para chat/completions e retorna o JSON da resposta
+
+    O timeout é o tempo máximo de leitura da resposta; a conexão em si
+    usa TIMEOUT_CONEXAO. Levanta ErroOpenRouter se o status não for 200.
+    Payloads idênticos são respondidos pelo cache em disco, a menos que
+    usar_cache seja False ou CACHE_IA_DESATIVADO esteja no .env.
+    Antes de enviar, aguarda o limitador de taxa compartilhado.
+
+    Com streaming (padrão: OPENROUTER_STREAMING no .env) a resposta é lida
+    em pedaços SSE: a leitura para assim que parar_em aparece no texto e
+    validar(texto_parcial) pode abortar cedo devolvendo um motivo, o que
+    levanta ErroSaidaInvalida. O retorno tem o mesmo formato do modo normal.
+
+    Falhas de rede, 429 e 5xx são repetidas até RETRY_MAX vezes com backoff
+    exponencial (respeitando Retry-After), sempre passando pelo disjuntor
+    compartilhado. O erro só chega ao chamador depois da última tentativa.
+
+    Com OPENROUTER_CASSETE/OPENROUTER_CASSETE_MODO no .env, cada tentativa é
+    gravada na cassete ou reproduzida dela sem acessar a rede.
+
+    parar_em também vira stop sequence do provedor (o modelo para de gerar
+    ali mesmo sem streaming) e é recolocado no fim do texto. Com etapa, o
+    tamanho da resposta alimenta o orçamento de max_tokens (ORCAMENTO).
+    Toda chamada (inclusive falhas e acertos de cache) vira uma linha no
+    registro_ia.jsonl com etapa e slug.
+
+    Com OPENROUTER_HEDGE no .env, uma tentativa que passa do percentil de
+    latência da etapa ganha uma duplicata; vale a primeira resposta boa.
+
+    Cada tentativa ocupa uma vaga da janela AIMD compartilhada (JANELA), que
+    cresce com respostas saudáveis e encolhe com 429/5xx.
+
+    A chave de API de cada tentativa vem do POOL_CHAVES (o Authorization de
+    headers é substituído); se uma chave for recusada, a próxima tentativa
+    usa outra na hora.
+
+    Etapas com rota no ROTEADOR trocam o modelo e o timeout do payload pelos
+    da rota; se o modelo estiver lento ou falhando, a tentativa vai para o
+    próximo da lista.
+    """
+    if parar_em and "stop" not in payload:
+        payload = dict(payload, stop=[parar_em])
+
+    # Na reprodução o modelo é o que foi gravado, não o das estatísticas ao vivo
+    gravado = None
+    if CASSETE.reproduzindo:
+        base = payload
+
+        def gravado(modelo):
+            return CASSETE.tem(dict(base, model=modelo))
+
+    escolha = ROTEADOR.escolher(etapa, gravado=gravado)
+    if escolha:
+        modelo, timeout = escolha
+        payload = dict(payload, model=modelo)
+
+    # Com cassete ativa toda chamada precisa passar por ela, então o cache fica de fora
+    usar_cache = usar_cache and not cache_ia.CACHE_DESATIVADO and not CASSETE.ativa
+    if streaming is None:
+        streaming = STREAMING_PADRAO
+
+    if usar_cache:
+        resposta_cache = cache_ia.ler(payload)
+        if resposta_cache is not None:
+            print("   💾 Resposta reaproveitada do cache da IA")
+            REGISTRO.anotar(etapa, slug, payload, 'cache', 0.0, resultado=resposta_cache)
+            return resposta_cache
+
+    registrar_metrica('chamadas')
+    inicio = time.monotonic()
+
+    for tentativa in range(RETRY_MAX + 1):
+        DISJUNTOR.aguardar()
+        if JANELA:
+            JANELA.entrar()
+        inicio_tentativa = time.monotonic()
+
+        try:
+            resultado = _enviar_com_hedge(payload, headers, timeout, streaming, parar_em, validar, etapa)
+        except Exception as e:
+            if JANELA:
+                JANELA.sair(etapa, time.monotonic() - inicio_tentativa, _status_erro(e))
+            if escolha and erro_repetivel(e):
+                ROTEADOR.registrar(etapa, payload["model"], time.monotonic() - inicio_tentativa, False)
+            if getattr(e, 'chave_recusada', False) and tentativa < RETRY_MAX:
+                # Problema da chave, não do provedor: troca de chave sem esperar
+                DISJUNTOR.registrar_sucesso(inicio_tentativa)
+                registrar_metrica('retries')
+                continue
+            if not erro_repetivel(e):
+                # O provedor respondeu; o problema é da requisição ou da saída
+                DISJUNTOR.registrar_sucesso(inicio_tentativa)
+                registrar_metrica('falhas_definitivas')
+                REGISTRO.anotar(etapa, slug, payload, _status_erro(e), time.monotonic() - inicio_tentativa,
+                                time.monotonic() - inicio, tentativa)
+                raise
+
+            DISJUNTOR.registrar_falha(inicio_tentativa)
+            if tentativa == RETRY_MAX:
+                registrar_metrica('falhas_definitivas')
+                REGISTRO.anotar(etapa, slug, payload, _status_erro(e), time.monotonic() - inicio_tentativa,
+                                time.monotonic() - inicio, tentativa)
+                raise
+
+            espera = calcular_espera(tentativa, getattr(e, 'retry_after', None))
+            registrar_metrica('retries')
+            print(f"   🔁 Tentativa {tentativa + 1} falhou ({str(e)[:80]}); nova tentativa em {espera:.1f}s")
+            time.sleep(espera)
+            if escolha:
+                # A próxima tentativa vai para outro modelo da rota, se houver
+                escolha = ROTEADOR.escolher(etapa, evitar=payload["model"], gravado=gravado)
+                modelo, timeout = escolha
+                payload = dict(payload, model=modelo)
+            continue
+
+        if JANELA:
+            JANELA.sair(etapa, time.monotonic() - inicio_tentativa, 200)
+        DISJUNTOR.registrar_sucesso(inicio_tentativa)
+        HEDGE.registrar(etapa, time.monotonic() - inicio_tentativa)
+        if escolha:
+            ROTEADOR.registrar(etapa, payload["model"], time.monotonic() - inicio_tentativa, True)
+        REGISTRO.anotar(etapa, slug, payload, 200, time.monotonic() - inicio_tentativa,
+                        time.monotonic() - inicio, tentativa, resultado)
+        break
+
+    if parar_em:
+        _recolocar_parada(resultado, parar_em)
+    ORCAMENTO.registrar(etapa, payload, resultado, time.monotonic() - inicio)
+    ORCAMENTO.registrar_prompt(etapa, resultado.get("usage"))
+
+    if usar_cache and resultado.get("choices"):
+        cache_ia.gravar(payload, resultado)
+
+    return resultado
+
+
+def _status_erro(erro):
+    """Status para o registro: HTTP, 'saida_invalida' ou 'rede'"""
+    if isinstance(erro, ErroSaidaInvalida):
+        return 'saida_invalida'
+    if isinstance(erro, ChamadaCancelada):
+        return 'cancelada'
+    return getattr(erro, 'status_code', None) or 'rede'
+
+
+def _recolocar_parada(resultado, parar_em):
+    """O provedor não devolve a stop sequence; recoloca para os extratores"""
+    for escolha in resultado.get("choices") or []:
+        mensagem = escolha.get("message") or {}
+        conteudo = mensagem.get("content")
+        if conteudo and escolha.get("finish_reason") == "stop" and parar_em not in conteudo[-len(parar_em) * 4:]:
+            mensagem["content"] = conteudo.rstrip() + parar_em
+
+
+def _enviar_com_hedge(payload, headers, timeout, streaming, parar_em, validar, etapa):
+    """Uma tentativa, com duplicata se ela passar do limiar de latência da etapa
+
+    A duplicata só sai se houver orçamento (OPENROUTER_HEDGE_ORCAMENTO) e
+    vaga livre na janela AIMD. A cópia perdedora é avisada: no streaming ela
+    fecha a conexão no próximo pedaço; sem streaming não há como interromper
+    a espera pela resposta, que é descartada quando chegar. Por isso a vaga
+    extra da janela só é devolvida quando as duas cópias terminam.
+    """
+    limiar = None
+    if HEDGE_ATIVO and etapa and not CASSETE.reproduzindo:
+        limiar = HEDGE.limiar(etapa)
+    if limiar is None:
+        return _enviar(payload, headers, timeout, streaming, parar_em, validar)
+
+    cancelado = threading.Event()
+    original = _disparar(payload, headers, timeout, streaming, parar_em, validar, cancelado)
+    try:
+        return original.result(timeout=limiar)
+    except FuturesTimeout:
+        pass
+
+    if JANELA and not JANELA.tentar_entrar():
+        return original.result()
+    if not HEDGE.reservar_duplicata():
+        if JANELA:
+            JANELA.sair(etapa, 0.0, None)
+        return original.result()
+
+    registrar_metrica('hedges')
+    print(f"   🪝 Chamada de {etapa} passou de {limiar:.0f}s: enviando duplicata")
+    inicio_duplicata = time.monotonic()
+    duplicata = _disparar(payload, headers, timeout, streaming, parar_em, validar, cancelado)
+    if JANELA:
+        _devolver_vaga_no_fim(original, duplicata, etapa, inicio_duplicata)
+
+    pendentes = {original, duplicata}
+    erro = None
+    while pendentes:
+        prontos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+        for futuro in prontos:
+            if futuro.exception() is None:
+                cancelado.set()
+                if futuro is duplicata:
+                    registrar_metrica('hedges_vencedores')
+                return futuro.result()
+            erro = erro or futuro.exception()
+    raise erro
+
+
+def _devolver_vaga_no_fim(original, duplicata, etapa, inicio_duplicata):
+    """Libera a vaga da duplicata na janela quando a última das duas cópias terminar
+
+    A vaga da tentativa é liberada por chamar_chat assim que há resposta;
+    a cópia que continuar em voo fica com a vaga extra.
+    """
+    lock = threading.Lock()
+    pendentes = [2]
+    latencia = [0.0]
+
+    def terminou(futuro):
+        with lock:
+            if futuro is duplicata:
+                latencia[0] = time.monotonic() - inicio_duplicata
+            pendentes[0] -= 1
+            if pendentes[0]:
+                return
+        erro = duplicata.exception()
+        JANELA.sair(etapa, latencia[0], 200 if erro is None else _status_erro(erro))
+
+    original.add_done_callback(terminou)
+    duplicata.add_done_callback(terminou)
+
+
+def _disparar(payload, headers, timeout, streaming, parar_em, validar, cancelado):
+    """Roda _enviar numa thread daemon e devolve um Future com o resultado"""
+    futuro = Future()
+
+    def executar():
+        try:
+            futuro.set_result(_enviar(payload, headers, timeout, streaming, parar_em, validar, cancelado))
+        except BaseException as e:
+            futuro.set_exception(e)
+
+    threading.Thread(target=executar, name="hedge", daemon=True).start()
+    return futuro
+
+
+def _enviar(payload, headers, timeout, streaming, parar_em, validar, cancelado=None):
+    """Faz uma única tentativa de chamada, já passando pelo limitador da chave
+
+    Com uma cassete ativa, a tentativa é gravada ou servida a partir dela.
+    """
+    # Escolhe a chave com mais orçamento e respeita os limites por minuto dela
+    tokens_estimados = estimar_tokens(payload)
+    chave = POOL_CHAVES.adquirir(tokens_estimados)
+
+    inicio = time.monotonic()
+    try:
+        if CASSETE.reproduzindo:
+            resultado = _reproduzir_cassete(payload)
+        else:
+            resultado = _enviar_gravando(payload, headers, chave.chave, timeout, streaming, parar_em, validar, cancelado)
+    except Exception as e:
+        # Chave recusada e tirada de rotação: quem chamou tenta de novo com outra
+        e.chave_recusada = POOL_CHAVES.liberar(chave, _status_erro(e), time.monotonic() - inicio,
+                                               retry_after=getattr(e, 'retry_after', None))
+        raise
+
+    tokens = (resultado.get("usage") or {}).get("total_tokens")
+    POOL_CHAVES.liberar(chave, 200, time.monotonic() - inicio, tokens)
+    chave.limitador.ajustar_tokens(tokens_estimados, tokens)
+    return resultado
+
+
+def _enviar_gravando(payload, headers, chave_api, timeout, streaming, parar_em, validar, cancelado):
+    """Envia pela rede e, com a cassete gravando, registra o resultado"""
+    inicio = time.monotonic()
+    try:
+        resultado = _enviar_rede(payload, headers, chave_api, timeout, streaming, parar_em, validar, cancelado)
+    except (ErroSaidaInvalida, ChamadaCancelada):
+        raise
+    except ErroOpenRouter as e:
+        if CASSETE.gravando:
+            CASSETE.gravar(payload, e.status_code, texto_erro=e.texto, latencia=time.monotonic() - inicio)
+        raise
+    except requests.RequestException as e:
+        if CASSETE.gravando:
+            CASSETE.gravar(payload, None, texto_erro=str(e), latencia=time.monotonic() - inicio)
+        raise
+
+    if CASSETE.gravando:
+        CASSETE.gravar(payload, 200, resposta=resultado, latencia=time.monotonic() - inicio)
+
+    return resultado
+
+
+def _reproduzir_cassete(payload):
+    """Converte o registro da cassete de volta em resultado ou exceção"""
+    try:
+        registro = CASSETE.reproduzir(payload)
+    except CasseteNaoEncontrada as e:
+        raise ErroOpenRouter(404, str(e))
+
+    if registro['status'] == 200:
+        return registro['resposta']
+    if registro['status'] is None:
+        raise requests.ConnectionError(registro['erro'])
+    raise ErroOpenRouter(registro['status'], registro['erro'])
+
+
+def _enviar_rede(payload, headers, chave_api, timeout, streaming, parar_em, validar, cancelado=None):
+    """Envia a requisição HTTP e lê a resposta (normal ou streaming)"""
+    if chave_api:
+        headers = dict(headers, Authorization=f"Bearer {chave_api}")
+
+    response = obter_sessao().post(
+        OPENROUTER_URL,
+        headers=headers,
+        json=dict(payload, stream=True) if streaming else payload,
+        timeout=(TIMEOUT_CONEXAO, timeout),
+        stream=streaming
+    )
+
+    if response.status_code != 200:
+        retry_after = segundos_retry_after(response, padrao=None)
+        raise ErroOpenRouter(response.status_code, response.text, retry_after)
+
+    if streaming:
+        resultado = ler_streaming(response, parar_em, validar, cancelado)
+    else:
+        resultado = response.json()
+
+    return resultado
+
+
+def ler_streaming(response, parar_em=None, validar=None, cancelado=None):
+    """Consome os eventos SSE de uma resposta em streaming e monta o JSON final
+
+    Se o evento cancelado for sinalizado, para de ler e fecha a conexão.
+    """
+    texto = ""
+    usage = None
+    modelo = None
+    finish_reason = None
+
+    # SSE é sempre UTF-8; sem charset no Content-Type o requests assumiria ISO-8859-1
+    response.encoding = "utf-8"
+
+    try:
+        for linha in response.iter_lines(decode_unicode=True):
+            # Linhas vazias separam eventos; ":" são comentários de keep-alive
+            if cancelado is not None and cancelado.is_set():
+                raise ChamadaCancelada()
+            if not linha or not linha.startswith("data:"):
+                continue
+
+            dados = linha[5:].strip()
+            if dados == "[DONE]":
+                break
+
+            evento = json.loads(dados)
+            if "error" in evento:
+                erro = evento["error"]
+                raise ErroOpenRouter(erro.get("code", 500), erro.get("message", dados))
+
+            modelo = evento.get("model", modelo)
+            usage = evento.get("usage") or usage
+
+            novo = ""
+            for escolha in evento.get("choices", []):
+                finish_reason = escolha.get("finish_reason") or finish_reason
+                novo += (escolha.get("delta") or {}).get("content") or ""
+
+            if not novo:
+                continue
+            texto += novo
+
+            # Só o trecho novo (mais a emenda) pode conter o marcador de parada
+            if parar_em:
+                posicao = texto.find(parar_em, max(0, len(texto) - len(novo) - len(parar_em)))
+                if posicao != -1:
+                    texto = texto[:posicao + len(parar_em)]
+                    finish_reason = "stop"
+                    break
+
+            if validar:
+                motivo = validar(texto)
+                if motivo:
+                    raise ErroSaidaInvalida(motivo, texto)
+    finally:
+        response.close()
+
+    return {
+        "model": modelo,
+        "choices": [{
+            "message": {"role": "assistant", "content": texto},
+            "finish_reason": finish_reason
+        }],
+        "usage": usage
+    }
@@ -5,22 +5,40 @@ FINALIZADOR HTML SIMPLIFICADO - Versão funcional com prompt completo
 
 import os
 import re
-import requests
-import time
 import csv
+import hashlib
 import json
+import threading
+import time
 import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from html.parser import HTMLParser
 from pathlib import Path
 from dotenv import load_dotenv
 
+from cliente_openrouter import chamar_chat, ErroOpenRouter, MonitorArtigo
+from limitador_taxa import CHAVES_API
+from orcamento_tokens import ORCAMENTO, mostrar_orcamento
+from resiliencia import mostrar_metricas, resumo_janela, workers_para_janela
+
 load_dotenv()
 
 # Configurações
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 ROOT_DIR = Path.cwd() / "docs"
 CSV_PRODUTOS = Path.cwd() / "produtos.csv"
 HISTORICO_FILE = Path.cwd() / "historico_simples.txt"
 
+# Produtos refinados ao mesmo tempo no "processar todos"; sem valor no .env,
+# o bastante para a janela AIMD decidir quantas requisições ficam em voo
+FINALIZADOR_WORKERS = int(os.getenv("FINALIZADOR_WORKERS") or workers_para_janela(4))
+
+# "completo" manda o artigo inteiro numa chamada; "secoes" refina cada <h2> em paralelo;
+# "edicoes" pede só a lista de alterações e aplica localmente
+FINALIZADOR_MODO = os.getenv("FINALIZADOR_MODO", "completo").strip().lower()
+
+# O histórico recebe appends de vários workers
+LOCK_HISTORICO = threading.Lock()
+
 # PROMPT EDITORIAL COMPLETO
 PROMPT_EDITORIAL = """Você é um editor humano sênior, especialista em SEO, UX editorial e conteúdo de conversão para sites de review que ranqueiam no Google.
 
@@ -156,6 +174,62 @@ ARTICLE:
 <article class="content">conteúdo refinado aqui...</article>
 """
 
+# Resumo do PROMPT_EDITORIAL enviado em cada seção no modo "secoes"
+BRIEF_SECAO = """Você é um editor humano sênior de um site de reviews. Refine UMA SEÇÃO de um artigo maior.
+
+REGRAS:
+- Refinar, expandir e humanizar; não recriar do zero
+- Manter o <h2> da seção (pode melhorar o texto dele) e o HTML simples (<p>, <ul>, <li>, <strong>, <h3>)
+- NÃO alterar URLs existentes, NÃO inventar links, NÃO criar CTAs de afiliado
+- NÃO mencionar afiliados ou comissões, NÃO citar anos, sem linguagem publicitária exagerada
+- Escrever como quem já usou o produto: exemplos concretos, micro-histórias do dia a dia
+- Evitar "excelente", "incrível", "imperdível"; contras honestos; variações naturais da palavra-chave
+- As outras seções são refinadas separadamente: não repita o conteúdo delas
+
+FORMATO DE SAÍDA: somente o HTML da seção refinada, sem comentários, sem markdown e sem <article>.
+"""
+
+PROMPT_META = """Você é um editor sênior de SEO. Reescreva o title e a meta description de um review.
+Title com até 60 caracteres e intenção de busca ("vale a pena", "é bom"); description com até 155 caracteres.
+NÃO citar anos, sem linguagem publicitária exagerada.
+
+FORMATO DE SAÍDA (OBRIGATÓRIO):
+TITLE:
+<título otimizado>
+
+DESCRIPTION:
+<meta description otimizada>
+"""
+
+# Modo "edicoes": mesmas diretrizes, mas a resposta é uma lista de alterações
+FORMATO_EDICOES = """📌 FORMATO DE SAÍDA (OBRIGATÓRIO): responda SOMENTE com um JSON, sem markdown.
+NÃO reescreva o artigo inteiro: devolva apenas o que muda. Trechos bons ficam de fora.
+
+{
+  "title": "<título otimizado ou null para manter>",
+  "description": "<meta description otimizada ou null para manter>",
+  "edicoes": [
+    {"acao": "substituir_secao", "secao": "<texto exato do <h2>, ou INTRODUCAO>", "html": "<seção completa refinada, com o <h2>>"},
+    {"acao": "inserir_apos", "secao": "<texto exato do <h2>, ou INTRODUCAO>", "html": "<nova seção com <h2> próprio>"},
+    {"acao": "substituir_trecho", "de": "<trecho copiado exatamente do artigo>", "para": "<trecho novo>"}
+  ]
+}
+"""
+
+PROMPT_EDICOES = PROMPT_EDITORIAL.split("📌 FORMATO DE SAÍDA")[0] + FORMATO_EDICOES
+
+# Versão de cada prompt: o histórico guarda a do prompt que foi enviado, e só
+# mudar o texto dele (não trocar de FINALIZADOR_MODO) põe a página na fila de novo
+PROMPTS_POR_MODO = {
+    "completo": PROMPT_EDITORIAL,
+    "secoes": BRIEF_SECAO + PROMPT_META,
+    "edicoes": PROMPT_EDICOES
+}
+VERSOES_PROMPT = {
+    modo: hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]
+    for modo, prompt in PROMPTS_POR_MODO.items()
+}
+
 def criar_slug(texto):
     """Cria slug igual ao gerador.py"""
     texto = unicodedata.normalize('NFKD', texto)
@@ -168,16 +242,66 @@ def criar_slug(texto):
     return slug[:60]
 
 def carregar_historico():
-    """Carrega histórico de processamentos"""
+    """Carrega histórico de processamentos: slug -> {'hash', 'versao'}
+    
+    Cada linha é "slug<TAB>hash do article<TAB>versão do prompt"; a última
+    linha de um slug vale. Linhas antigas, só com o slug, ficam sem hash.
+    """
+    historico = {}
     if HISTORICO_FILE.exists():
         with open(HISTORICO_FILE, 'r', encoding='utf-8') as f:
-            return set(line.strip() for line in f if line.strip())
-    return set()
+            for line in f:
+                partes = line.strip().split("\t")
+                if partes[0]:
+                    historico[partes[0]] = {
+                        'hash': partes[1] if len(partes) > 1 else None,
+                        'versao': partes[2] if len(partes) > 2 else None
+                    }
+    return historico
+
+def salvar_historico(slug, hash_conteudo=None, versao=None):
+    """Salva no histórico (seguro entre workers); versao é a do prompt enviado"""
+    with LOCK_HISTORICO:
+        with open(HISTORICO_FILE, 'a', encoding='utf-8') as f:
+            if hash_conteudo:
+                f.write(f"{slug}\t{hash_conteudo}\t{versao or VERSOES_PROMPT['completo']}\n")
+            else:
+                f.write(f"{slug}\n")
 
-def salvar_historico(slug):
-    """Salva no histórico"""
-    with open(HISTORICO_FILE, 'a', encoding='utf-8') as f:
-        f.write(f"{slug}\n")
+def hash_article(article_full):
+    """Hash do <article> como está no arquivo"""
+    return hashlib.sha256(article_full.strip().encode('utf-8')).hexdigest()[:16]
+
+def situacao_produto(slug, historico):
+    """Decide se o produto precisa de refinamento; retorna (situacao, caminho)
+    
+    novo: nunca refinado | alterado: o <article> mudou depois do refinamento
+    prompt: o texto do prompt usado mudou desde então | ok: nada a fazer
+    ausente: arquivo não encontrado
+    """
+    registro = historico.get(slug)
+    caminho = encontrar_arquivo(slug)
+    if not caminho:
+        return ('ok' if registro else 'ausente'), None
+    
+    if not registro:
+        return 'novo', caminho
+    
+    # Registro antigo sem hash: não há como comparar, considera finalizado
+    if not registro['hash']:
+        return 'ok', caminho
+    
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            article_full = extrair_conteudo(f.read())[3]
+    except Exception:
+        return 'novo', caminho
+    
+    if not article_full or hash_article(article_full) != registro['hash']:
+        return 'alterado', caminho
+    if registro['versao'] not in VERSOES_PROMPT.values():
+        return 'prompt', caminho
+    return 'ok', caminho
 
 def carregar_produtos_csv():
     """Carrega produtos do CSV"""
@@ -226,15 +350,13 @@ def extrair_conteudo(html):
     
     return title, description, article_content, article_full
 
-def chamar_ia_para_refinamento(title, description, article, produto_nome, categoria):
+def chamar_ia_para_refinamento(title, description, article, produto_nome, categoria, log=print):
     """Chama a IA com o prompt completo"""
     headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
         "Content-Type": "application/json"
     }
     
-    prompt_completo = PROMPT_EDITORIAL + f"""
-
+    prompt_completo = ORCAMENTO.montar_prompt('refinamento', PROMPT_EDITORIAL, f"""
 DADOS DO PRODUTO:
 Nome: {produto_nome}
 Categoria: {categoria}
@@ -253,7 +375,7 @@ ARTICLE:
 </article>
 
 AGORA, REFINE ESTE CONTEÚDO seguindo TODAS as diretrizes acima.
-"""
+""")
     
     data = {
         "model": "deepseek/deepseek-chat",
@@ -268,25 +390,359 @@ AGORA, REFINE ESTE CONTEÚDO seguindo TODAS as diretrizes acima.
             }
         ],
         "temperature": 0.7,
-        "max_tokens": 6000
+        "max_tokens": ORCAMENTO.max_tokens('refinamento', 6000)
     }
     
     try:
-        response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers=headers,
-            json=data,
-            timeout=180
-        )
+        resposta = chamar_chat(data, headers, timeout=180, parar_em="</article>",
+                               validar=MonitorArtigo(mostrar=log is print), etapa='refinamento',
+                               slug=criar_slug(produto_nome))
+        return resposta["choices"][0]["message"]["content"]
+    except ErroOpenRouter as e:
+        log(f"   ❌ Erro API: {e}")
+        return None
+    except Exception as e:
+        log(f"   ❌ Erro de conexão: {e}")
+        return None
+
+# Tags sem fechamento, que não abrem nível
+TAGS_VAZIAS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+# Blocos que não vão para a IA: sumário, CTA e links de afiliado
+BLOCO_FIXO = re.compile(r"""class=["'][^"']*\b(?:toc|cta)\b|btn-cta|nofollow""", re.IGNORECASE)
+
+class NosDeTopo(HTMLParser):
+    """Posições (início, fim) dos elementos e comentários de primeiro nível
+    
+    Tags fechadas fora de ordem desempilham até a tag correspondente;
+    equilibrado fica False se sobrar tag aberta ou fechamento sem abertura.
+    """
+    
+    def __init__(self, html):
+        super().__init__(convert_charrefs=False)
+        self.html = html
+        self.inicio_linhas = [0] + [m.end() for m in re.finditer(r"\n", html)]
+        self.pilha = []
+        self.inicio = None
+        self.nos = []
+        self.equilibrado = True
+        self.feed(html)
+        self.close()
+        if self.pilha:
+            self.equilibrado = False
+            self.nos.append((self.inicio, len(html), self.pilha[0]))
+    
+    def _posicao(self):
+        linha, coluna = self.getpos()
+        return self.inicio_linhas[linha - 1] + coluna
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in TAGS_VAZIAS:
+            self.handle_startendtag(tag, attrs)
+            return
+        if not self.pilha:
+            self.inicio = self._posicao()
+        self.pilha.append(tag)
+    
+    def handle_startendtag(self, tag, attrs):
+        if not self.pilha:
+            inicio = self._posicao()
+            self.nos.append((inicio, self.html.index(">", inicio) + 1, tag))
+    
+    def handle_endtag(self, tag):
+        if tag in TAGS_VAZIAS:
+            return
+        if tag not in self.pilha:
+            self.equilibrado = False
+            return
+        while self.pilha.pop() != tag:
+            self.equilibrado = False
+        if not self.pilha:
+            self.nos.append((self.inicio, self.html.index(">", self._posicao()) + 1, tag))
+    
+    def handle_comment(self, dados):
+        if not self.pilha:
+            inicio = self._posicao()
+            self.nos.append((inicio, self.html.index("-->", inicio) + 3, "!--"))
+
+def tags_equilibradas(html):
+    """Toda tag aberta no trecho é fechada dentro dele"""
+    return NosDeTopo(html).equilibrado
+
+def dividir_secoes(article):
+    """Divide o conteúdo do <article> em pedaços; retorna [(html, fixo)]
+    
+    Só corta entre elementos de primeiro nível, então nenhum wrapper fica
+    dividido entre dois pedaços. Cada <h2> de primeiro nível abre uma
+    seção; o primeiro pedaço é a introdução antes dele. Comentários,
+    sumário, CTA e blocos com <h2> interno ficam fixos (não vão para a IA).
+    Juntar os html devolve o article original.
+    """
+    cortes = []
+    for inicio, fim, tag in NosDeTopo(article).nos:
+        trecho = article[inicio:fim]
+        fixo = tag == "!--" or bool(BLOCO_FIXO.search(trecho)) or (tag != "h2" and re.search(r"<h2[\s>]", trecho, re.IGNORECASE))
+        if fixo or tag == "h2":
+            cortes.append((inicio, bool(fixo)))
+        if fixo:
+            cortes.append((fim, False))
+    
+    partes = []
+    limites = [(0, False)] + cortes + [(len(article), False)]
+    for (inicio, fixo), (fim, _) in zip(limites, limites[1:]):
+        trecho = article[inicio:fim]
+        if not trecho:
+            continue
+        if partes and (not trecho.strip() or (fixo and partes[-1][1])):
+            # Espaço entre blocos e blocos fixos seguidos ficam num pedaço só
+            partes[-1] = (partes[-1][0] + trecho, partes[-1][1])
+        else:
+            partes.append((trecho, fixo))
+    return partes
+
+def refinar_secao(secao, indice, total, title, produto_nome, categoria, headers):
+    """Refina uma seção; retorna o HTML refinado ou None"""
+    introducao = indice == 1 and not re.match(r"\s*<h2", secao, re.IGNORECASE)
+    prompt = ORCAMENTO.montar_prompt('refinamento_secao', BRIEF_SECAO, f"""
+DADOS DO PRODUTO:
+Nome: {produto_nome}
+Categoria: {categoria}
+Título do artigo: {title}
+Seção {indice} de {total}{" (introdução)" if introducao else ""}
+
+SEÇÃO ATUAL:
+{secao}
+""")
+    data = {
+        "model": "deepseek/deepseek-chat",
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.7,
+        # Espaço para expandir a seção em até ~2x (4 caracteres por token)
+        "max_tokens": min(6000, max(800, len(secao) // 2))
+    }
+    resposta = chamar_chat(data, headers, timeout=120, etapa='refinamento_secao', slug=criar_slug(produto_nome))
+    texto = resposta["choices"][0]["message"]["content"].strip()
+    texto = re.sub(r"^```(?:html)?\s*|\s*```$", "", texto).strip()
+    texto = re.sub(r"</?article[^>]*>", "", texto, flags=re.IGNORECASE).strip()
+    
+    # Seção que tinha <h2> precisa continuar tendo, e sem tag aberta ou
+    # fechada a mais (senão quebraria os blocos vizinhos ao remontar)
+    if not texto or ("<h2" in secao.lower() and "<h2" not in texto.lower()):
+        return None
+    if not tags_equilibradas(texto):
+        return None
+    return texto
+
+def refinar_meta(title, description, produto_nome, categoria, headers):
+    """Refina só title e description; retorna o texto no formato TITLE/DESCRIPTION"""
+    data = {
+        "model": "deepseek/deepseek-chat",
+        "messages": [{"role": "user", "content": ORCAMENTO.montar_prompt('meta', PROMPT_META, f"""
+Produto: {produto_nome}
+Categoria: {categoria}
+
+TITLE:
+{title}
+
+DESCRIPTION:
+{description}
+""")}],
+        "temperature": 0.7,
+        "max_tokens": ORCAMENTO.max_tokens('meta', 300)
+    }
+    resposta = chamar_chat(data, headers, timeout=60, etapa='meta', slug=criar_slug(produto_nome))
+    return resposta["choices"][0]["message"]["content"]
+
+def refinar_por_secoes(title, description, article, produto_nome, categoria, log=print):
+    """Refina as seções do artigo em paralelo e remonta na ordem original
+    
+    Retorna o mesmo formato TITLE/DESCRIPTION/ARTICLE da chamada única, então
+    extrair_resultado serve para os dois modos. Seções que falharem ficam
+    com o texto original; blocos fixos (sumário, CTA) passam sem mudança.
+    """
+    headers = {
+        "Content-Type": "application/json"
+    }
+    partes = dividir_secoes(article)
+    refinadas = [html for html, _ in partes]
+    secoes = [i for i, (_, fixo) in enumerate(partes) if not fixo]
+    meta = ""
+    falhas = 0
+    
+    with ThreadPoolExecutor(max_workers=len(secoes) + 1, thread_name_prefix="secao") as executor:
+        futuro_meta = executor.submit(refinar_meta, title, description, produto_nome, categoria, headers)
+        futuros = {
+            executor.submit(refinar_secao, partes[indice][0], n, len(secoes), title, produto_nome, categoria, headers): (n, indice)
+            for n, indice in enumerate(secoes, 1)
+        }
         
-        if response.status_code == 200:
-            return response.json()["choices"][0]["message"]["content"]
+        for futuro in as_completed(futuros):
+            n, indice = futuros[futuro]
+            try:
+                texto = futuro.result()
+            except Exception as e:
+                log(f"   ⚠️ Seção {n}: {e}")
+                texto = None
+            if texto:
+                refinadas[indice] = texto + "\n\n"
+            else:
+                falhas += 1
+        
+        try:
+            meta = futuro_meta.result()
+        except Exception as e:
+            log(f"   ⚠️ Title/description mantidos: {e}")
+    
+    if falhas == len(secoes):
+        return None
+    if falhas:
+        log(f"   ⚠️ {falhas} de {len(secoes)} seções mantidas sem refinamento")
+    
+    corpo = "".join(refinadas).strip()
+    return f"""{meta.strip()}
+
+ARTICLE:
+<article class="content">
+{corpo}
+</article>"""
+
+def chave_secao(secao):
+    """Texto normalizado do <h2> da seção (ou INTRODUCAO) para casar as edições"""
+    match = re.match(r"\s*<h2[^>]*>(.*?)</h2>", secao, re.IGNORECASE | re.DOTALL)
+    if not match:
+        return "introducao"
+    texto = re.sub(r"<[^>]+>", "", match.group(1))
+    return re.sub(r"\s+", " ", texto).strip().lower()
+
+def aplicar_edicoes(article, edicoes, log=print):
+    """Aplica a lista de edições ao conteúdo do <article>; retorna (novo, aplicadas)
+    
+    As seções são casadas pelo <h2> original, mesmo que uma edição anterior
+    tenha trocado o texto do título. Blocos fixos (sumário, CTA) não são
+    editados.
+    """
+    partes = dividir_secoes(article)
+    secoes = [html for html, _ in partes]
+    chaves = [None if fixo else chave_secao(html) for html, fixo in partes]
+    # Só o primeiro pedaço sem <h2> é a introdução
+    chaves = [None if chave == "introducao" and "introducao" in chaves[:i] else chave for i, chave in enumerate(chaves)]
+    aplicadas = 0
+    
+    if not isinstance(edicoes, list):
+        log(f"   ⚠️ 'edicoes' não é uma lista ({type(edicoes).__name__}); nada aplicado")
+        return article, 0
+    
+    for edicao in edicoes:
+        if not isinstance(edicao, dict):
+            log(f"   ⚠️ Edição ignorada (não é um objeto): {str(edicao)[:60]}")
+            continue
+        acao = edicao.get("acao")
+        html = str(edicao.get("html") or "").strip()
+        
+        if acao == "substituir_trecho":
+            de, para = str(edicao.get("de") or ""), str(edicao.get("para") or "")
+            for i, secao in enumerate(secoes):
+                if de and de in secao and chaves[i] is not None:
+                    secoes[i] = secao.replace(de, para, 1)
+                    aplicadas += 1
+                    break
+            else:
+                log(f"   ⚠️ Trecho não encontrado: {de[:60]}")
+            continue
+        
+        alvo = re.sub(r"\s+", " ", str(edicao.get("secao") or "")).strip().lower()
+        alvo = "introducao" if alvo in ("introducao", "introdução") else alvo
+        indice = next((i for i, chave in enumerate(chaves) if chave == alvo), None)
+        
+        if indice is None or not html:
+            log(f"   ⚠️ Edição ignorada ({acao}): seção '{edicao.get('secao')}' não encontrada")
+            continue
+        if not tags_equilibradas(html):
+            log(f"   ⚠️ Edição ignorada ({acao}): HTML com tags desequilibradas")
+            continue
+        
+        if acao == "substituir_secao":
+            secoes[indice] = html + "\n\n"
+        elif acao == "inserir_apos":
+            secoes.insert(indice + 1, html + "\n\n")
+            chaves.insert(indice + 1, chave_secao(html))
         else:
-            print(f"   ❌ Erro API: {response.status_code}")
-            return None
+            log(f"   ⚠️ Ação desconhecida: {acao}")
+            continue
+        aplicadas += 1
+    
+    return "".join(secoes), aplicadas
+
+def refinar_por_edicoes(title, description, article, produto_nome, categoria, log=print):
+    """Pede à IA só as alterações e aplica localmente
+    
+    O texto que não muda não passa de novo pelo modelo. Retorna o mesmo
+    formato TITLE/DESCRIPTION/ARTICLE da chamada única.
+    """
+    headers = {
+        "Content-Type": "application/json"
+    }
+    data = {
+        "model": "deepseek/deepseek-chat",
+        "messages": [
+            {"role": "system", "content": "Você é um editor sênior. Responda apenas com o JSON de edições solicitado."},
+            {"role": "user", "content": ORCAMENTO.montar_prompt('edicoes', PROMPT_EDICOES, f"""
+DADOS DO PRODUTO:
+Nome: {produto_nome}
+Categoria: {categoria}
+
+CONTEÚDO ATUAL:
+
+TITLE:
+{title}
+
+DESCRIPTION:
+{description}
+
+ARTICLE:
+<article class="content">
+{article}
+</article>
+""", compactar_dados=False)}
+        ],
+        "temperature": 0.7,
+        "max_tokens": ORCAMENTO.max_tokens('edicoes', 4000),
+        "response_format": {"type": "json_object"}
+    }
+    
+    try:
+        resposta = chamar_chat(data, headers, timeout=180, etapa='edicoes', slug=criar_slug(produto_nome))
+        texto = resposta["choices"][0]["message"]["content"]
+        dados = json.loads(texto[texto.index("{"):texto.rindex("}") + 1])
+    except ErroOpenRouter as e:
+        log(f"   ❌ Erro API: {e}")
+        return None
+    except ValueError as e:
+        log(f"   ❌ IA não retornou JSON de edições válido: {e}")
+        return None
     except Exception as e:
-        print(f"   ❌ Erro de conexão: {e}")
+        log(f"   ❌ Erro de conexão: {e}")
         return None
+    
+    edicoes = dados.get("edicoes") or []
+    novo_article, aplicadas = aplicar_edicoes(article, edicoes, log)
+    total = len(edicoes) if isinstance(edicoes, list) else 0
+    log(f"   ✂️ {aplicadas} de {total} edições aplicadas ({len(texto)} caracteres recebidos)")
+    
+    # title/description só valem se vierem como texto
+    novo_title = dados.get("title") if isinstance(dados.get("title"), str) else None
+    nova_desc = dados.get("description") if isinstance(dados.get("description"), str) else None
+    
+    return f"""TITLE:
+{novo_title or title}
+
+DESCRIPTION:
+{nova_desc or description}
+
+ARTICLE:
+<article class="content">
+{novo_article}
+</article>"""
 
 def extrair_resultado(resultado):
     """Extrai título, description e article da resposta da IA"""
@@ -311,47 +767,68 @@ def extrair_resultado(resultado):
     
     return novo_title, nova_desc, novo_article
 
-def processar_arquivo(caminho, produto_info):
-    """Processa um único arquivo"""
-    print(f"\n📝 Processando: {produto_info['nome']}")
-    print(f"   📁 {caminho.relative_to(ROOT_DIR)}")
+def processar_arquivo(caminho, produto_info, log=print):
+    """Processa um único arquivo
+    
+    log recebe as mensagens; no modo concorrente elas são juntadas e
+    impressas em bloco quando o produto termina.
+    """
+    log(f"\n📝 Processando: {produto_info['nome']}")
+    log(f"   📁 {caminho.relative_to(ROOT_DIR)}")
     
     try:
         with open(caminho, 'r', encoding='utf-8') as f:
             html = f.read()
     except Exception as e:
-        print(f"   ❌ Erro ao ler arquivo: {e}")
+        log(f"   ❌ Erro ao ler arquivo: {e}")
         return False
     
     # Extrai conteúdo
     title, description, article_content, article_full = extrair_conteudo(html)
     if not article_content:
-        print("   ❌ Não encontrou <article> no HTML")
+        log("   ❌ Não encontrou <article> no HTML")
         return False
     
     tamanho_original = len(article_content)
-    print(f"   📊 Tamanho original: {tamanho_original} caracteres")
+    log(f"   📊 Tamanho original: {tamanho_original} caracteres")
     
     # Chama IA
-    print("   🤖 Chamando IA para refinamento (pode levar até 2 minutos)...")
-    resultado_ia = chamar_ia_para_refinamento(
-        title, description, article_content, 
-        produto_info['nome'], produto_info['categoria']
-    )
+    secoes = [html for html, fixo in dividir_secoes(article_content) if not fixo]
+    if FINALIZADOR_MODO == "secoes" and len(secoes) > 1:
+        modo = "secoes"
+        log(f"   🤖 Refinando {len(secoes)} seções em paralelo...")
+        resultado_ia = refinar_por_secoes(
+            title, description, article_content,
+            produto_info['nome'], produto_info['categoria'], log
+        )
+    elif FINALIZADOR_MODO == "edicoes":
+        modo = "edicoes"
+        log("   🤖 Pedindo lista de edições à IA...")
+        resultado_ia = refinar_por_edicoes(
+            title, description, article_content,
+            produto_info['nome'], produto_info['categoria'], log
+        )
+    else:
+        modo = "completo"
+        log("   🤖 Chamando IA para refinamento (pode levar até 2 minutos)...")
+        resultado_ia = chamar_ia_para_refinamento(
+            title, description, article_content, 
+            produto_info['nome'], produto_info['categoria'], log
+        )
     
     if not resultado_ia:
-        print("   ❌ Falha na resposta da IA")
+        log("   ❌ Falha na resposta da IA")
         return False
     
     # Extrai resultado
     novo_title, nova_desc, novo_article = extrair_resultado(resultado_ia)
     
     if not novo_article:
-        print("   ❌ IA não retornou ARTICLE válido")
+        log("   ❌ IA não retornou ARTICLE válido")
         # Salva resposta para debug
         with open(f"debug_{produto_info['slug']}.txt", 'w', encoding='utf-8') as f:
             f.write(resultado_ia)
-        print(f"   💾 Resposta salva em debug_{produto_info['slug']}.txt")
+        log(f"   💾 Resposta salva em debug_{produto_info['slug']}.txt")
         return False
     
     # Aplica modificações
@@ -381,45 +858,48 @@ def processar_arquivo(caminho, produto_info):
         with open(caminho, 'w', encoding='utf-8') as f:
             f.write(html)
         
-        print(f"   ✅ Salvo! {len(modificacoes)} modificações aplicadas")
-        print(f"   📈 Tamanho novo: {tamanho_novo} caracteres")
-        print(f"   📊 Diferença: {'+' if diferenca > 0 else ''}{diferenca} caracteres")
+        log(f"   ✅ Salvo! {len(modificacoes)} modificações aplicadas")
+        log(f"   📈 Tamanho novo: {tamanho_novo} caracteres")
+        log(f"   📊 Diferença: {'+' if diferenca > 0 else ''}{diferenca} caracteres")
         
-        # Salva no histórico
-        salvar_historico(produto_info['slug'])
+        # Salva no histórico com o hash do article que ficou no arquivo
+        salvar_historico(produto_info['slug'], hash_article(extrair_conteudo(html)[3] or novo_article),
+                         VERSOES_PROMPT[modo])
         return True
         
     except Exception as e:
-        print(f"   ❌ Erro ao salvar arquivo: {e}")
+        log(f"   ❌ Erro ao salvar arquivo: {e}")
         return False
 
 def mostrar_status():
     """Mostra status atual"""
     historico = carregar_historico()
     produtos = carregar_produtos_csv()
+    situacoes = {slug: situacao_produto(slug, historico)[0] for slug in produtos}
     
     print("\n" + "="*60)
     print("📊 STATUS ATUAL")
     print("="*60)
     
     total_produtos = len(produtos)
-    finalizados = len([s for s in produtos if s in historico])
+    finalizados = len([s for s in produtos if situacoes[s] == 'ok'])
     pendentes = total_produtos - finalizados
     
     print(f"Total de produtos no CSV: {total_produtos}")
     print(f"Produtos já finalizados: {finalizados}")
     print(f"Produtos pendentes: {pendentes}")
     
+    motivos = {'novo': '', 'alterado': ' - página alterada', 'prompt': ' - prompt novo', 'ausente': ' - arquivo não encontrado'}
     if pendentes > 0:
         print("\n⏳ PENDENTES:")
         for slug, info in produtos.items():
-            if slug not in historico:
-                print(f"   • {info['nome']} ({info['categoria']})")
+            if situacoes[slug] != 'ok':
+                print(f"   • {info['nome']} ({info['categoria']}){motivos[situacoes[slug]]}")
     
     if finalizados > 0:
         print("\n✅ FINALIZADOS:")
         for slug, info in produtos.items():
-            if slug in historico:
+            if situacoes[slug] == 'ok':
                 print(f"   • {info['nome']}")
 
 def menu_principal():
@@ -456,8 +936,11 @@ def processar_todos():
     produtos = carregar_produtos_csv()
     
     pendentes = []
+    contagem = {'novo': 0, 'alterado': 0, 'prompt': 0, 'ausente': 0, 'ok': 0}
     for slug, info in produtos.items():
-        if slug not in historico:
+        situacao, _ = situacao_produto(slug, historico)
+        contagem[situacao] += 1
+        if situacao != 'ok':
             pendentes.append((slug, info))
     
     if not pendentes:
@@ -465,30 +948,77 @@ def processar_todos():
         return
     
     print(f"\n🚀 Encontrados {len(pendentes)} produtos pendentes")
+    if contagem['alterado'] or contagem['prompt']:
+        print(f"   ♻️ {contagem['alterado']} com página alterada e {contagem['prompt']} com prompt novo voltaram para a fila")
+    print(f"   ⏭️ {contagem['ok']} sem alterações desde o último refinamento")
+    
+    resposta = input(f"Produtos simultâneos (Enter = {FINALIZADOR_WORKERS}): ").strip()
+    workers = int(resposta) if resposta.isdigit() and int(resposta) > 0 else FINALIZADOR_WORKERS
+    
+    inicio = time.monotonic()
+    if workers > 1:
+        sucessos, falhas = processar_concorrente(pendentes, workers)
+    else:
+        sucessos = 0
+        falhas = 0
+        
+        for i, (slug, info) in enumerate(pendentes, 1):
+            print(f"\n[{i}/{len(pendentes)}] {'='*40}")
+            
+            caminho = encontrar_arquivo(slug)
+            if not caminho:
+                print(f"❌ Arquivo não encontrado: {info['nome']}")
+                falhas += 1
+                continue
+            
+            if processar_arquivo(caminho, info):
+                sucessos += 1
+            else:
+                falhas += 1
+    
+    duracao = time.monotonic() - inicio
+    print(f"\n📊 Resultado: {sucessos} sucessos, {falhas} falhas")
+    print(f"⏱️ {len(pendentes)} produtos em {duracao / 60:.1f} min ({len(pendentes) / max(duracao, 1) * 60:.2f} produtos/min)")
+    mostrar_metricas()
+    mostrar_orcamento()
+
+def refinar_produto(slug, info):
+    """Refina um produto juntando as mensagens; retorna (sucesso, mensagens)"""
+    mensagens = []
+    caminho = encontrar_arquivo(slug)
+    if not caminho:
+        mensagens.append(f"❌ Arquivo não encontrado: {info['nome']}")
+        return False, mensagens
     
+    sucesso = processar_arquivo(caminho, info, log=lambda *args: mensagens.append(" ".join(str(a) for a in args)))
+    return sucesso, mensagens
+
+def processar_concorrente(pendentes, workers):
+    """Refina vários produtos ao mesmo tempo; retorna (sucessos, falhas)"""
+    print(f"⚡ Refinando com {workers} produtos simultâneos")
     sucessos = 0
     falhas = 0
     
-    for i, (slug, info) in enumerate(pendentes, 1):
-        print(f"\n[{i}/{len(pendentes)}] {'='*40}")
-        
-        caminho = encontrar_arquivo(slug)
-        if not caminho:
-            print(f"❌ Arquivo não encontrado: {info['nome']}")
-            falhas += 1
-            continue
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="finalizador") as executor:
+        futuros = {executor.submit(refinar_produto, slug, info): info for slug, info in pendentes}
         
-        if processar_arquivo(caminho, info):
-            sucessos += 1
-        else:
-            falhas += 1
-        
-        # Pausa entre processamentos
-        if i < len(pendentes):
-            print(f"\n⏳ Aguardando 10 segundos...")
-            time.sleep(10)
+        for i, futuro in enumerate(as_completed(futuros), 1):
+            info = futuros[futuro]
+            try:
+                sucesso, mensagens = futuro.result()
+            except Exception as e:
+                sucesso, mensagens = False, [f"❌ Erro inesperado em {info['nome']}: {e}"]
+            
+            print(f"\n[{i}/{len(pendentes)}] {'='*40}{resumo_janela()}")
+            for mensagem in mensagens:
+                print(mensagem)
+            
+            if sucesso:
+                sucessos += 1
+            else:
+                falhas += 1
     
-    print(f"\n📊 Resultado: {sucessos} sucessos, {falhas} falhas")
+    return sucessos, falhas
 
 def processar_especifico():
     """Processa um produto específico"""
@@ -541,7 +1071,7 @@ def main():
     print("🎯 FINALIZADOR HTML SIMPLIFICADO")
     print("=" * 60)
     
-    if not OPENROUTER_API_KEY:
+    if not CHAVES_API:
         print("❌ ERRO: OPENROUTER_API_KEY não encontrada")
         print("💡 Verifique seu arquivo .env")
         return
@@ -5,7 +5,6 @@ SEO Avançado + Artigos Humanos + Funnel Completo + Multi-idioma
 """
 
 from dotenv import load_dotenv
-import os
 
 # Carrega variáveis do .env ANTES de qualquer coisa
 load_dotenv()
@@ -15,16 +14,21 @@ import csv
 import re
 import random
 import shutil
+import threading
 import unicodedata
 import xml.etree.ElementTree as ET
 from datetime import datetime
 from pathlib import Path
-from time import sleep
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from xml.dom import minidom
 
+from limitador_taxa import CHAVES_API
+from orcamento_tokens import ORCAMENTO, mostrar_orcamento
+from resiliencia import mostrar_metricas, resumo_janela, workers_para_janela
+
 # Tenta importar requests para IA
 try:
-    import requests
+    from cliente_openrouter import chamar_chat, ErroOpenRouter
     HAS_REQUESTS = True
 except ImportError:
     HAS_REQUESTS = False
@@ -38,13 +42,16 @@ class GeradorReal:
         self.includes_dir = self.docs_dir / "includes"
         self.templates_dir = self.base_dir / "templates"
         
-        # Configurações de IA - AGORA SÓ DO .env
-        self.ia_api_key = os.getenv("OPENROUTER_API_KEY")
+        # Configurações de IA - AGORA SÓ DO .env (OPENROUTER_API_KEY ou OPENROUTER_API_KEYS)
+        self.ia_api_key = CHAVES_API[0] if CHAVES_API else None
         self.ia_provider = 'openrouter'
         self.has_requests = HAS_REQUESTS
         
         self.site_url = site_url.rstrip('/')
         
+        # Serializa escritas compartilhadas (CSV, sitemap, índices) no modo concorrente
+        self._lock_disco = threading.RLock()
+        
         print("=" * 70)
         print("🤖 GERADOR REAL v6.0 - SISTEMA PROFISSIONAL AVANÇADO")
         print("=" * 70)
@@ -61,6 +68,19 @@ class GeradorReal:
         # Configurações padrão
         self.config = self.carregar_config()
         
+        # Cache de sidebars de IA por categoria + idioma
+        self.cache_sidebar_path = self.base_dir / "cache_sidebar.json"
+        self._cache_sidebar = None
+        self._lock_sidebar = threading.Lock()
+        self._locks_sidebar = {}
+        
+        # Pool auxiliar para chamadas de IA que rodam em paralelo dentro de um
+        # produto (sidebar, pre-landing). Tarefas deste pool nunca esperam por
+        # outras tarefas dele, então não há risco de deadlock. O tamanho
+        # acompanha os produtos simultâneos (ajustar_executor_ia).
+        self._executor_ia = None
+        self.ajustar_executor_ia(self.config.get('performance', {}).get('workers', 1))
+        
         # Verificar IA
         self.verificar_ia()
         
@@ -70,6 +90,16 @@ class GeradorReal:
         # Criar templates HTML básicos se não existirem
         self.criar_templates_basicos()
     
+    def ajustar_executor_ia(self, workers):
+        """Recria o pool auxiliar com 2 threads por produto simultâneo"""
+        tamanho = max(2, workers * 2)
+        if self._executor_ia is not None:
+            if self._tamanho_executor_ia == tamanho:
+                return
+            self._executor_ia.shutdown(wait=False)
+        self._executor_ia = ThreadPoolExecutor(max_workers=tamanho, thread_name_prefix="ia")
+        self._tamanho_executor_ia = tamanho
+    
     def criar_estrutura_pastas(self):
         """Cria pastas necessárias"""
         pastas = [
@@ -122,6 +152,11 @@ class GeradorReal:
             "funnel": {
                 "enable_preland": True,
                 "preland_suffix": "-guia-completo"
+            },
+            "performance": {
+                "workers": 4,
+                "sidebar_ttl_horas": 168,
+                "review_por_secoes": False
             }
         }
         
@@ -496,7 +531,11 @@ class GeradorReal:
         prompt = self.criar_prompt_ia_completo(produto, categoria, tipo_artigo, site_oficial, link_afiliado, idioma, palavras_chave)
         
         try:
-            conteudo = self.chamar_openrouter_api(prompt, idioma)
+            conteudo = None
+            if tipo_artigo.lower() == 'review' and self.config.get('performance', {}).get('review_por_secoes', False):
+                conteudo = self.gerar_review_por_secoes(prompt, produto, idioma)
+            if not conteudo:
+                conteudo = self.chamar_openrouter_api(prompt, idioma, etapa=tipo_artigo.lower(), slug=self.criar_slug(produto))
             
             if conteudo:
                 return conteudo
@@ -508,11 +547,123 @@ class GeradorReal:
             print(f"   ⚠️  Erro na IA: {e}")
             return self.gerar_conteudo_basico(produto, categoria, tipo_artigo, site_oficial, link_afiliado, idioma)
     
-    def chamar_openrouter_api(self, prompt, idioma='pt-BR'):
-        """Chama API do Open Router usando .env"""
-        OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+    def gerar_review_por_secoes(self, prompt, produto, idioma='pt-BR'):
+        """Gera o review em duas fases: esboço rápido e seções em paralelo
+        
+        A introdução (antes do primeiro H2) é escrita em paralelo com as
+        seções. Retorna o HTML costurado na ordem do esboço, ou None para
+        cair na chamada única.
+        """
+        slug = self.criar_slug(produto)
+        esboco = self.gerar_esboco_ia(prompt, idioma, slug)
+        if not esboco:
+            print("   ⚠️  Esboço não gerado, usando chamada única")
+            return None
+        
+        print(f"   🧩 Esboço com introdução e {len(esboco) - 1} seções, gerando em paralelo...")
+        secoes = [None] * len(esboco)
+        
+        # Pool próprio: o _executor_ia pode estar ocupado com quem chamou este método
+        with ThreadPoolExecutor(max_workers=len(esboco), thread_name_prefix="secao") as executor:
+            futuros = {
+                executor.submit(self.gerar_secao_ia, prompt, esboco, indice, idioma, slug): indice
+                for indice in range(len(esboco))
+            }
+            for futuro in as_completed(futuros):
+                indice = futuros[futuro]
+                try:
+                    secoes[indice] = futuro.result()
+                except Exception as e:
+                    print(f"   ⚠️  Erro em {esboco[indice]['titulo'] or 'introdução'}: {e}")
+        
+        faltando = [esboco[i]['titulo'] or 'introdução' for i, secao in enumerate(secoes) if not secao]
+        if faltando:
+            print(f"   ⚠️  Seções sem conteúdo ({', '.join(faltando)}), usando chamada única")
+            return None
+        
+        conteudo = "\n\n".join(secoes)
+        print(f"   ✅ Review de {produto} montado com {len(secoes) - 1} seções ({len(conteudo)} caracteres)")
+        return conteudo
+    
+    def gerar_esboco_ia(self, prompt, idioma='pt-BR', slug=None):
+        """Pede o esboço do artigo: a introdução e os H2 com os pontos-chave de cada um
+        
+        O primeiro item é a introdução (titulo None), seguido das seções.
+        """
+        pedido = prompt + """
+
+---
+FASE 1 - ESBOÇO: ainda NÃO escreva o artigo. Responda SOMENTE com um JSON, sem markdown:
+{"introducao": ["<ponto-chave da introdução>", "..."], "secoes": [{"titulo": "<texto do H2>", "pontos": ["<ponto-chave>", "..."]}]}
+Siga a estrutura pedida acima (a introdução antes do primeiro H2, depois uma entrada por H2, na ordem de publicação)."""
+        
+        resposta = self.chamar_openrouter_api(pedido, idioma, max_tokens=800, limpar=False, etapa='esboco', slug=slug)
+        if not resposta:
+            return None
+        
+        try:
+            dados = json.loads(resposta[resposta.index("{"):resposta.rindex("}") + 1])
+            secoes = [
+                {'titulo': str(s['titulo']).strip(), 'pontos': [str(p) for p in s.get('pontos', [])]}
+                for s in dados.get('secoes', []) if s.get('titulo')
+            ]
+            introducao = {'titulo': None, 'pontos': [str(p) for p in dados.get('introducao') or []]}
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"   ⚠️  Esboço inválido: {e}")
+            return None
+        
+        return [introducao] + secoes if len(secoes) >= 2 else None
+    
+    def gerar_secao_ia(self, prompt, esboco, indice, idioma='pt-BR', slug=None):
+        """Escreve uma seção do esboço; retorna o HTML começando pelo <h2>
+        
+        O item sem título (índice 0) é a introdução, que vem sem <h2>.
+        """
+        secao = esboco[indice]
+        sumario = "\n".join(f"{i}. {s['titulo']}" for i, s in enumerate(esboco) if s['titulo'])
+        pontos = "\n".join(f"- {p}" for p in secao['pontos'])
+        
+        if not secao['titulo']:
+            pedido = prompt + f"""
+
+---
+FASE 2 - INTRODUÇÃO: o artigo é escrito em partes paralelas. Esboço das seções:
+{sumario}
+
+Escreva SOMENTE a introdução, que vem antes da primeira seção: 1 a 3 parágrafos <p>, sem <h2>.
+Pontos-chave:
+{pontos or "- apresente o produto e o que o leitor vai descobrir no review"}
+
+Retorne apenas o HTML da introdução."""
+            return self.chamar_openrouter_api(pedido, idioma, max_tokens=600, etapa='introducao', slug=slug)
+        
+        pedido = prompt + f"""
+
+---
+FASE 2 - SEÇÃO: o artigo é escrito em partes paralelas. Esboço completo:
+{sumario}
+
+Escreva SOMENTE a seção {indice}: "{secao['titulo']}"
+Pontos-chave:
+{pontos}
+
+Comece com <h2>{secao['titulo']}</h2> e não repita o conteúdo das outras seções.
+Retorne apenas o HTML desta seção."""
+        
+        conteudo = self.chamar_openrouter_api(pedido, idioma, max_tokens=1500, etapa='secao', slug=slug)
+        if not conteudo:
+            return None
+        if not re.search(r'<h2[\s>]', conteudo, re.IGNORECASE):
+            conteudo = f"<h2>{secao['titulo']}</h2>\n{conteudo}"
+        return conteudo
+    
+    def chamar_openrouter_api(self, prompt, idioma='pt-BR', max_tokens=4000, limpar=True, etapa=None, slug=None):
+        """Chama API do Open Router usando .env
         
-        if not OPENROUTER_API_KEY:
+        Com etapa, max_tokens vira o teto e o valor enviado é o aprendido
+        do histórico de respostas daquela etapa.
+        """
+        if not CHAVES_API:
             print("❌ ERRO: OPENROUTER_API_KEY não encontrada")
             return None
         
@@ -528,8 +679,8 @@ class GeradorReal:
         idioma_base = self.normalizar_idioma_base(idioma)
         system_message = system_messages.get(idioma_base, system_messages['pt-BR'])
         
+        # O Authorization é preenchido pelo cliente com a chave escolhida no pool
         headers = {
-            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
             "Content-Type": "application/json",
             "HTTP-Referer": "http://localhost",
             "X-Title": "Gerador Real v6.0"
@@ -541,54 +692,63 @@ class GeradorReal:
                 {"role": "system", "content": system_message},
                 {"role": "user", "content": prompt}
             ],
-            "max_tokens": 4000,
+            "max_tokens": ORCAMENTO.max_tokens(etapa, max_tokens) if etapa else max_tokens,
             "temperature": 0.7,
             "stream": False
         }
         
         try:
-            response = requests.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers=headers,
-                json=data,
-                timeout=120
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                conteudo = result["choices"][0]["message"]["content"]
+            result = chamar_chat(data, headers, timeout=120, etapa=etapa, slug=slug)
+            conteudo = result["choices"][0]["message"]["content"]
+            if limpar:
                 conteudo = self.limpar_resposta_ia(conteudo)
-                print(f"   ✅ Open Router gerou {len(conteudo)} caracteres em {idioma.upper()}")
-                return conteudo
-            else:
-                print(f"   ❌ Erro Open Router ({response.status_code}): {response.text[:200]}")
-                return None
+            print(f"   ✅ Open Router gerou {len(conteudo)} caracteres em {idioma.upper()}")
+            return conteudo
                 
+        except ErroOpenRouter as e:
+            print(f"   ❌ Erro Open Router ({e.status_code}): {e.texto[:200]}")
+            return None
         except Exception as e:
             print(f"   ❌ Erro na requisição ao Open Router: {e}")
             return None
     
     def criar_prompt_ia_completo(self, produto, categoria, tipo_artigo, site_oficial, link_afiliado, idioma='pt-BR', palavras_chave=None):
-        """Cria prompt completo baseado no tipo de artigo e idioma"""
+        """Cria prompt completo baseado no tipo de artigo e idioma
+        
+        O template vira um prefixo idêntico para todos os produtos do mesmo
+        tipo/idioma (os campos do produto ficam como [CAMPO]), e os valores
+        vão num bloco de dados no fim. Assim o provedor reaproveita o prefixo
+        em cache entre chamadas.
+        """
         template = self.carregar_prompt_template(tipo_artigo, idioma)
         
         if template:
-            prompt = template
-            prompt = prompt.replace("{PRODUTO}", produto)
-            prompt = prompt.replace("{CATEGORIA}", categoria)
-            prompt = prompt.replace("{TIPO_ARTIGO}", tipo_artigo)
-            prompt = prompt.replace("{SITE_OFICIAL}", site_oficial)
-            prompt = prompt.replace("{LINK_AFILIADO}", link_afiliado)
-            prompt = prompt.replace("{SITE_URL}", self.site_url)
-            prompt = prompt.replace("{SITE_NAME}", self.config['site']['name'])
-            prompt = prompt.replace("{AUTHOR}", self.config['site']['author'])
-            prompt = prompt.replace("{ANO_ATUAL}", str(datetime.now().year))
-            prompt = prompt.replace("{IDIOMA}", idioma.upper())
+            # Valores do site são iguais em todas as chamadas: podem ficar no prefixo
+            prefixo = template
+            prefixo = prefixo.replace("{SITE_URL}", self.site_url)
+            prefixo = prefixo.replace("{SITE_NAME}", self.config['site']['name'])
+            prefixo = prefixo.replace("{AUTHOR}", self.config['site']['author'])
+            prefixo = prefixo.replace("{ANO_ATUAL}", str(datetime.now().year))
+            prefixo = prefixo.replace("{IDIOMA}", idioma.upper())
             
+            campos = {
+                "PRODUTO": produto,
+                "CATEGORIA": categoria,
+                "TIPO_ARTIGO": tipo_artigo,
+                "SITE_OFICIAL": site_oficial,
+                "LINK_AFILIADO": link_afiliado
+            }
+            # Palavras-chave por último: são o único trecho que o orçamento pode cortar
             if palavras_chave:
-                prompt = prompt.replace("{PALAVRAS_CHAVE}", palavras_chave)
+                campos["PALAVRAS_CHAVE"] = palavras_chave
+            
+            for campo in campos:
+                prefixo = prefixo.replace("{" + campo + "}", f"[{campo}]")
+            
+            dados = "## DADOS DESTE ARTIGO (valores dos campos entre colchetes acima):\n"
+            dados += "\n".join(f"- {campo}: {valor}" for campo, valor in campos.items())
             
-            return prompt
+            return ORCAMENTO.montar_prompt(tipo_artigo.lower(), prefixo, dados, cortavel=True)
         
         # Fallback para prompt padrão
         return self.criar_prompt_padrao(produto, categoria, tipo_artigo, site_oficial, link_afiliado, idioma)
@@ -1201,8 +1361,12 @@ body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; line-height
 
     # ==================== CRIAÇÃO DE ARTIGOS ====================
     
-    def criar_artigo_completo(self, titulo, conteudo_html, categoria, produto_slug, tipo_artigo, nome_original, site_oficial, link_afiliado, idioma='pt-BR', is_preland=False):
-        """Cria artigo HTML completo"""
+    def criar_artigo_completo(self, titulo, conteudo_html, categoria, produto_slug, tipo_artigo, nome_original, site_oficial, link_afiliado, idioma='pt-BR', is_preland=False, sidebar_futuro=None):
+        """Cria artigo HTML completo
+        
+        sidebar_futuro é o Future devolvido por iniciar_sidebar_com_ia; quando
+        informado, a sidebar de IA já vem sendo gerada junto com o corpo.
+        """
         
         print(f"   📝 Criando artigo ({tipo_artigo}) em {idioma.upper()}: {titulo[:60]}...")
         
@@ -1229,7 +1393,12 @@ body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; line-height
         sidebar_content = self.criar_sidebar_conteudo(categoria, produto_slug, nome_original, link_afiliado, idioma, is_preland)
         
         # Se estiver usando IA, podemos pedir para a IA criar uma sidebar mais personalizada
-        if self.ia_api_key and self.has_requests and tipo_artigo.lower() != 'preland':
+        if sidebar_futuro is not None:
+            # Ponto de junção: a sidebar foi pedida antes do corpo do artigo
+            sidebar_ia = sidebar_futuro.result()
+            if sidebar_ia:
+                sidebar_content = sidebar_ia
+        elif self.ia_api_key and self.has_requests and tipo_artigo.lower() != 'preland':
             # Tentar criar sidebar mais sofisticada com IA
             sidebar_ia = self.criar_sidebar_com_ia(nome_original, categoria, link_afiliado, idioma)
             if sidebar_ia:
@@ -1297,29 +1466,63 @@ body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; line-height
             
             print(f"   ✅ Artigo salvo em {idioma.upper()}: {categoria}/{produto_slug}/index.html")
             
-            # Atualizar índice da categoria
-            self.atualizar_index_categoria(categoria, idioma)
-            
-            # Atualizar sitemap
-            self.atualizar_sitemap(url_relativa, datetime.now())
+            with self._lock_disco:
+                # Atualizar índice da categoria
+                self.atualizar_index_categoria(categoria, idioma)
+                
+                # Atualizar sitemap
+                self.atualizar_sitemap(url_relativa, datetime.now())
             
             return caminho_arquivo
         except Exception as e:
             print(f"   ❌ Erro ao salvar artigo: {e}")
             return None
     
+    def iniciar_sidebar_com_ia(self, produto, categoria, link_afiliado, tipo_artigo, idioma='pt-BR'):
+        """Dispara criar_sidebar_com_ia em segundo plano e retorna o Future
+        
+        Retorna None quando a sidebar de IA não se aplica (sem IA ou preland).
+        """
+        if not self.ia_api_key or not self.has_requests or tipo_artigo.lower() == 'preland':
+            return None
+        
+        return self._executor_ia.submit(self.criar_sidebar_com_ia, produto, categoria, link_afiliado, idioma)
+    
     def criar_sidebar_com_ia(self, produto, categoria, link_afiliado, idioma='pt-BR'):
-        """Cria sidebar personalizada com IA SEM PREÇOS"""
+        """Cria sidebar personalizada com IA SEM PREÇOS
+        
+        A IA gera um modelo por categoria + idioma, com {{PRODUTO}} e
+        {{LINK_AFILIADO}} no lugar dos dados do produto. O modelo fica em
+        cache_sidebar.json por performance.sidebar_ttl_horas e é preenchido
+        aqui para cada artigo.
+        """
         if not self.ia_api_key or not self.has_requests:
             return None
         
+        chave = f"{categoria.lower()}|{self.normalizar_idioma_base(idioma)}"
+        
+        # Um lock por chave evita vários workers pedindo a mesma sidebar
+        with self._lock_sidebar:
+            lock_chave = self._locks_sidebar.setdefault(chave, threading.Lock())
+        
+        with lock_chave:
+            modelo = self.ler_cache_sidebar(chave)
+            if modelo is None:
+                modelo = self.gerar_modelo_sidebar_ia(categoria, idioma)
+                if modelo is None:
+                    return None
+                self.salvar_cache_sidebar(chave, modelo)
+        
+        return modelo.replace("{{PRODUTO}}", produto).replace("{{LINK_AFILIADO}}", link_afiliado)
+    
+    def gerar_modelo_sidebar_ia(self, categoria, idioma='pt-BR'):
+        """Pede à IA o modelo de sidebar de uma categoria"""
         try:
             # Preparar prompt para criar sidebar personalizada SEM PREÇOS
-            prompt = self.criar_prompt_sidebar(produto, categoria, link_afiliado, idioma)
+            prompt = self.criar_prompt_sidebar(categoria, idioma)
             
             # Chamar IA
             headers = {
-                "Authorization": f"Bearer {self.ia_api_key}",
                 "Content-Type": "application/json",
                 "HTTP-Referer": "http://localhost",
                 "X-Title": "Gerador Real v6.0"
@@ -1337,41 +1540,78 @@ body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; line-height
                         "content": prompt
                     }
                 ],
-                "max_tokens": 1000,
+                "max_tokens": ORCAMENTO.max_tokens('sidebar', 1000),
                 "temperature": 0.7,
                 "stream": False
             }
             
-            response = requests.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers=headers,
-                json=data,
-                timeout=30
-            )
+            result = chamar_chat(data, headers, timeout=30, etapa='sidebar', slug=self.criar_slug(categoria))
+            sidebar = result["choices"][0]["message"]["content"]
+            sidebar = self.limpar_resposta_ia(sidebar)
             
-            if response.status_code == 200:
-                result = response.json()
-                sidebar = result["choices"][0]["message"]["content"]
-                sidebar = self.limpar_resposta_ia(sidebar)
-                print(f"   ✅ Sidebar personalizada criada com IA")
-                return sidebar
-            else:
+            # Sem o marcador o botão sairia com link inventado em toda a categoria
+            if "{{LINK_AFILIADO}}" not in sidebar:
+                print(f"   ⚠️  Sidebar da IA para {categoria} sem {{{{LINK_AFILIADO}}}}; usando a sidebar padrão")
                 return None
+            
+            print(f"   ✅ Sidebar da categoria {categoria} criada com IA")
+            return sidebar
                 
+        except ErroOpenRouter:
+            return None
         except Exception as e:
             print(f"   ⚠️  Erro ao criar sidebar com IA: {e}")
             return None
     
-    def criar_prompt_sidebar(self, produto, categoria, link_afiliado, idioma='pt-BR'):
-        """Cria prompt para gerar sidebar personalizada SEM PREÇOS"""
+    def ler_cache_sidebar(self, chave):
+        """Retorna o modelo de sidebar em cache, se ainda estiver no prazo"""
+        with self._lock_sidebar:
+            if self._cache_sidebar is None:
+                self._cache_sidebar = {}
+                if self.cache_sidebar_path.exists():
+                    try:
+                        with open(self.cache_sidebar_path, 'r', encoding='utf-8') as f:
+                            self._cache_sidebar = json.load(f)
+                    except Exception as e:
+                        print(f"⚠️  Erro ao ler cache de sidebars: {e}")
+            
+            entrada = self._cache_sidebar.get(chave)
+        
+        if not entrada:
+            return None
+        
+        ttl_horas = self.config.get('performance', {}).get('sidebar_ttl_horas', 168)
+        idade = datetime.now() - datetime.fromisoformat(entrada['criado_em'])
+        if idade.total_seconds() > ttl_horas * 3600:
+            return None
+        
+        return entrada['html']
+    
+    def salvar_cache_sidebar(self, chave, modelo):
+        """Guarda o modelo de sidebar da categoria em cache_sidebar.json"""
+        with self._lock_sidebar:
+            self._cache_sidebar[chave] = {
+                'html': modelo,
+                'criado_em': datetime.now().isoformat()
+            }
+            try:
+                with open(self.cache_sidebar_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._cache_sidebar, f, indent=2, ensure_ascii=False)
+            except Exception as e:
+                print(f"⚠️  Erro ao salvar cache de sidebars: {e}")
+    
+    def criar_prompt_sidebar(self, categoria, idioma='pt-BR'):
+        """Cria prompt para gerar o modelo de sidebar da categoria SEM PREÇOS"""
         if idioma.lower().startswith('en'):
-            return f"""Create a personalized sidebar for a review article about {produto} in the {categoria} category.
+            return f"""Create a reusable sidebar for review articles in the {categoria} category.
 
 The sidebar should include:
-1. A special offer widget WITHOUT PRICES - just mention it's a limited time offer
+1. A special offer widget WITHOUT PRICES for the reviewed product - just mention it's a limited time offer
 2. A "Related Products" section with 3-4 products from the same category
 3. An "Information" section with links (About Us, Contact, Privacy Policy)
 
+The same sidebar will be used for many products. Write the literal placeholder {{{{PRODUTO}}}} wherever the reviewed product name goes and {{{{LINK_AFILIADO}}}} as the href of the offer button.
+
 IMPORTANT: DO NOT mention any prices, values, discounts percentages, or specific monetary amounts.
 
 Make it HTML valid, with CSS classes that match: widget, btn-sidebar, etc.
@@ -1379,13 +1619,15 @@ Create realistic product names related to {categoria}.
 
 Return ONLY the HTML code, no explanations."""
         else:
-            return f"""Crie uma sidebar personalizada para um artigo de review sobre {produto} na categoria {categoria}.
+            return f"""Crie uma sidebar reutilizável para artigos de review da categoria {categoria}.
 
 A sidebar deve incluir:
-1. Um widget de oferta especial SEM PREÇOS - apenas mencione que é uma oferta por tempo limitado
+1. Um widget de oferta especial SEM PREÇOS para o produto analisado - apenas mencione que é uma oferta por tempo limitado
 2. Uma seção "Produtos Relacionados" com 3-4 produtos da mesma categoria
 3. Uma seção "Informações" com links (Sobre Nós, Contato, Política de Privacidade)
 
+A mesma sidebar será usada em vários produtos. Escreva o marcador literal {{{{PRODUTO}}}} onde entra o nome do produto analisado e {{{{LINK_AFILIADO}}}} como href do botão da oferta.
+
 IMPORTANTE: NÃO mencione preços, valores, porcentagens de desconto ou quantias monetárias específicas.
 
 Faça HTML válido, com classes CSS que combinem: widget, btn-sidebar, etc.
@@ -1829,27 +2071,28 @@ Sitemap: {self.site_url}/sitemap.xml
             return False
         
         try:
-            # Ler CSV
-            with open(csv_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                linhas = list(reader)
-                cabecalho = reader.fieldnames
-            
-            # Atualizar linha correspondente
-            produto_nome = produto_data.get('produto', '')
-            for linha in linhas:
-                if linha.get('produto') == produto_nome:
-                    linha['status'] = status
-                    linha['data_publicacao'] = datetime.now().strftime("%Y-%m-%d")
-                    if caminho_artigo:
-                        linha['url_publicada'] = str(caminho_artigo.relative_to(self.docs_dir).parent).replace("\\", "/")
-                    break
-            
-            # Salvar CSV
-            with open(csv_path, 'w', encoding='utf-8', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=cabecalho)
-                writer.writeheader()
-                writer.writerows(linhas)
+            with self._lock_disco:
+                # Ler CSV
+                with open(csv_path, 'r', encoding='utf-8') as f:
+                    reader = csv.DictReader(f)
+                    linhas = list(reader)
+                    cabecalho = reader.fieldnames
+                
+                # Atualizar linha correspondente
+                produto_nome = produto_data.get('produto', '')
+                for linha in linhas:
+                    if linha.get('produto') == produto_nome:
+                        linha['status'] = status
+                        linha['data_publicacao'] = datetime.now().strftime("%Y-%m-%d")
+                        if caminho_artigo:
+                            linha['url_publicada'] = str(caminho_artigo.relative_to(self.docs_dir).parent).replace("\\", "/")
+                        break
+                
+                # Salvar CSV
+                with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+                    writer = csv.DictWriter(f, fieldnames=cabecalho)
+                    writer.writeheader()
+                    writer.writerows(linhas)
             
             print(f"   📊 CSV atualizado: {produto_nome}")
             return True
@@ -1941,15 +2184,22 @@ Sitemap: {self.site_url}/sitemap.xml
         print(f"\n   🔄 Gerando funnel para: {nome}")
         print(f"   📁 Categoria: {categoria} | 🌐 Idioma: {idioma}")
         
-        # 1. Gerar REVIEW
-        print(f"   📝 1. Gerando REVIEW...")
+        # Review e pre-landing não dependem um do outro: as duas gerações
+        # (e a sidebar do review) saem ao mesmo tempo
+        print(f"   📝 Gerando REVIEW e PRE-LANDING em paralelo...")
         slug_review = self.criar_slug(nome)
         titulo_review = self.criar_titulo_seo(nome, 'review', idioma)
+        titulo_preland = self.criar_titulo_seo(nome, 'preland', idioma)
         
+        sidebar_review = self.iniciar_sidebar_com_ia(nome, categoria, link_afiliado, 'review', idioma)
+        futuro_preland = self._executor_ia.submit(
+            self.gerar_conteudo_com_ia, nome, categoria, 'preland', site_oficial, link_afiliado, idioma
+        )
         conteudo_review = self.gerar_conteudo_com_ia(
             nome, categoria, 'review', site_oficial, link_afiliado, idioma
         )
         
+        # 1. Salvar REVIEW
         caminho_review = self.criar_artigo_completo(
             titulo=titulo_review,
             conteudo_html=conteudo_review,
@@ -1960,21 +2210,22 @@ Sitemap: {self.site_url}/sitemap.xml
             site_oficial=site_oficial,
             link_afiliado=link_afiliado,
             idioma=idioma,
-            is_preland=False
+            is_preland=False,
+            sidebar_futuro=sidebar_review
         )
         
         if not caminho_review:
+            futuro_preland.cancel()
             return False
         
         print(f"   ✅ Review criado: {categoria}/{slug_review}/")
         
-        # 2. Gerar PRE-LANDING (guia)
-        print(f"   📝 2. Gerando PRE-LANDING...")
-        titulo_preland = self.criar_titulo_seo(nome, 'preland', idioma)
-        
-        conteudo_preland = self.gerar_conteudo_com_ia(
-            nome, categoria, 'preland', site_oficial, link_afiliado, idioma
-        )
+        # 2. Salvar PRE-LANDING (guia)
+        try:
+            conteudo_preland = futuro_preland.result()
+        except Exception as e:
+            print(f"   ⚠️  Erro ao gerar PRE-LANDING: {e}")
+            conteudo_preland = None
         
         if not conteudo_preland:
             conteudo_preland = self.gerar_preland_basica(nome, categoria, site_oficial, link_afiliado, idioma)
@@ -2021,92 +2272,133 @@ Sitemap: {self.site_url}/sitemap.xml
             if usar_ia == 's':
                 tem_ia = True
         
+        # Número de produtos gerados ao mesmo tempo
+        workers = 1
+        if tem_ia:
+            workers_padrao = self.config.get('performance', {}).get('workers') or workers_para_janela(4)
+            resposta = input(f"Produtos simultâneos (Enter = {workers_padrao}): ").strip()
+            workers = int(resposta) if resposta.isdigit() and int(resposta) > 0 else workers_padrao
+        self.ajustar_executor_ia(workers)
+        
         print(f"\n🔧 MODO: {'🤖 COM IA' if tem_ia else '📝 SEM IA'}")
+        if workers > 1:
+            print(f"⚡ Concorrência: {workers} produtos simultâneos")
         print("="*40)
         
-        for i, produto_data in enumerate(produtos, 1):
-            print(f"\n[{i}/{len(produtos)}] {'='*30}")
-            
-            nome = produto_data.get('produto', '').strip()
-            if not nome:
-                continue
-            
-            categoria = produto_data.get('categoria', 'geral').strip().lower()
-            tipo = produto_data.get('tipo_artigo', 'review').strip().lower()
-            site_oficial = produto_data.get('site_oficial', '').strip()
-            link_afiliado = produto_data.get('links_afiliados', '').strip()
-            status = produto_data.get('status', 'pending').lower()
-            idioma = produto_data.get('idioma', 'pt-BR').strip()
-            
-            # Pular se já concluído
-            if status == 'completed':
-                print(f"   ⏭️  Já concluído: {nome[:40]}")
-                continue
-            
-            print(f"   📦 {nome}")
-            print(f"   📁 {categoria} • {tipo} • 🌐 {idioma}")
-            
-            if tipo == 'preland' and self.config['funnel']['enable_preland']:
-                # Gerar funnel completo
-                sucesso = self.gerar_funnel_completo(produto_data)
-                status_final = "completed" if sucesso else "error"
-                self.atualizar_csv_apos_geracao(produto_data, None, status_final)
-                
-            else:
-                # Gerar artigo único
-                slug = self.criar_slug(nome)
-                titulo = self.criar_titulo_seo(nome, tipo, idioma)
-                
-                # Gerar conteúdo
-                if tem_ia:
-                    conteudo = self.gerar_conteudo_com_ia(nome, categoria, tipo, site_oficial, link_afiliado, idioma)
-                    if conteudo is None:
-                        print("   ⚠️  IA falhou, usando conteúdo básico")
-                        conteudo = self.gerar_conteudo_basico(nome, categoria, tipo, site_oficial, link_afiliado, idioma)
-                else:
-                    conteudo = self.gerar_conteudo_basico(nome, categoria, tipo, site_oficial, link_afiliado, idioma)
+        if workers > 1:
+            self.processar_produtos_concorrente(produtos, tem_ia, workers)
+        else:
+            for i, produto_data in enumerate(produtos, 1):
+                print(f"\n[{i}/{len(produtos)}] {'='*30}")
                 
-                # Criar artigo
-                try:
-                    caminho = self.criar_artigo_completo(
-                        titulo=titulo,
-                        conteudo_html=conteudo,
-                        categoria=categoria,
-                        produto_slug=slug,
-                        tipo_artigo=tipo,
-                        nome_original=nome,
-                        site_oficial=site_oficial,
-                        link_afiliado=link_afiliado,
-                        idioma=idioma,
-                        is_preland=(tipo == 'preland')
-                    )
-                    
-                    # Atualizar CSV
-                    if caminho:
-                        self.atualizar_csv_apos_geracao(produto_data, caminho, "completed")
-                        print(f"   ✅ Gerado com sucesso em {idioma.upper()}")
-                    else:
-                        self.atualizar_csv_apos_geracao(produto_data, None, "error")
-                    
-                except Exception as e:
-                    print(f"   ❌ Erro: {e}")
-                    self.atualizar_csv_apos_geracao(produto_data, None, "error")
-                    continue
-            
-            # Pausa para IA
-            if tem_ia and i < len(produtos):
-                delay = random.randint(2, 4)
-                print(f"   ⏳ Aguardando {delay}s...")
-                sleep(delay)
+                self.processar_produto(produto_data, tem_ia)
         
         print("\n" + "="*70)
         print("🎉 PROCESSAMENTO CONCLUÍDO!")
         print("="*70)
         print(f"📊 {len(produtos)} produtos processados")
+        mostrar_metricas()
+        mostrar_orcamento()
         
         # Mostrar estatísticas
         self.mostrar_painel_controle()
     
+    def processar_produtos_concorrente(self, produtos, tem_ia, workers):
+        """Gera vários produtos ao mesmo tempo com um pool de threads"""
+        pendentes = [
+            p for p in produtos
+            if p.get('produto', '').strip() and p.get('status', 'pending').lower() != 'completed'
+        ]
+        
+        print(f"⏭️  Já concluídos: {len(produtos) - len(pendentes)}")
+        print(f"🚀 Pendentes: {len(pendentes)}")
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futuros = {executor.submit(self.processar_produto, p, tem_ia): p for p in pendentes}
+            
+            for i, futuro in enumerate(as_completed(futuros), 1):
+                nome = futuros[futuro].get('produto', '').strip()
+                try:
+                    futuro.result()
+                    print(f"\n[{i}/{len(pendentes)}] ✔️  Finalizado: {nome[:50]}{resumo_janela()}")
+                except Exception as e:
+                    print(f"\n[{i}/{len(pendentes)}] ❌ Erro em {nome[:50]}: {e}{resumo_janela()}")
+    
+    def processar_produto(self, produto_data, tem_ia):
+        """Gera o artigo (ou funnel) de uma linha do CSV e atualiza o status
+        
+        Retorna False quando a linha é pulada (sem nome ou já concluída).
+        """
+        nome = produto_data.get('produto', '').strip()
+        if not nome:
+            return False
+        
+        categoria = produto_data.get('categoria', 'geral').strip().lower()
+        tipo = produto_data.get('tipo_artigo', 'review').strip().lower()
+        site_oficial = produto_data.get('site_oficial', '').strip()
+        link_afiliado = produto_data.get('links_afiliados', '').strip()
+        status = produto_data.get('status', 'pending').lower()
+        idioma = produto_data.get('idioma', 'pt-BR').strip()
+        
+        # Pular se já concluído
+        if status == 'completed':
+            print(f"   ⏭️  Já concluído: {nome[:40]}")
+            return False
+        
+        print(f"   📦 {nome}")
+        print(f"   📁 {categoria} • {tipo} • 🌐 {idioma}")
+        
+        if tipo == 'preland' and self.config['funnel']['enable_preland']:
+            # Gerar funnel completo
+            sucesso = self.gerar_funnel_completo(produto_data)
+            status_final = "completed" if sucesso else "error"
+            self.atualizar_csv_apos_geracao(produto_data, None, status_final)
+            return True
+        
+        # Gerar artigo único
+        slug = self.criar_slug(nome)
+        titulo = self.criar_titulo_seo(nome, tipo, idioma)
+        
+        # Gerar conteúdo (com IA, a sidebar é pedida ao mesmo tempo que o corpo)
+        sidebar_futuro = None
+        if tem_ia:
+            sidebar_futuro = self.iniciar_sidebar_com_ia(nome, categoria, link_afiliado, tipo, idioma)
+            conteudo = self.gerar_conteudo_com_ia(nome, categoria, tipo, site_oficial, link_afiliado, idioma)
+            if conteudo is None:
+                print("   ⚠️  IA falhou, usando conteúdo básico")
+                conteudo = self.gerar_conteudo_basico(nome, categoria, tipo, site_oficial, link_afiliado, idioma)
+        else:
+            conteudo = self.gerar_conteudo_basico(nome, categoria, tipo, site_oficial, link_afiliado, idioma)
+        
+        # Criar artigo
+        try:
+            caminho = self.criar_artigo_completo(
+                titulo=titulo,
+                conteudo_html=conteudo,
+                categoria=categoria,
+                produto_slug=slug,
+                tipo_artigo=tipo,
+                nome_original=nome,
+                site_oficial=site_oficial,
+                link_afiliado=link_afiliado,
+                idioma=idioma,
+                is_preland=(tipo == 'preland'),
+                sidebar_futuro=sidebar_futuro
+            )
+            
+            # Atualizar CSV
+            if caminho:
+                self.atualizar_csv_apos_geracao(produto_data, caminho, "completed")
+                print(f"   ✅ Gerado com sucesso em {idioma.upper()}")
+            else:
+                self.atualizar_csv_apos_geracao(produto_data, None, "error")
+            
+        except Exception as e:
+            print(f"   ❌ Erro: {e}")
+            self.atualizar_csv_apos_geracao(produto_data, None, "error")
+        
+        return True
+    
     # ==================== MENU PRINCIPAL ====================
     
     def menu_principal(self):
@@ -2265,7 +2557,9 @@ Sitemap: {self.site_url}/sitemap.xml
             if self.ia_api_key:
                 usar_ia = input("Usar IA? (s/n): ").strip().lower()
             
+            sidebar_futuro = None
             if usar_ia == 's':
+                sidebar_futuro = self.iniciar_sidebar_com_ia(produto, categoria, link, tipo, idioma)
                 conteudo = self.gerar_conteudo_com_ia(produto, categoria, tipo, site, link, idioma)
             else:
                 conteudo = self.gerar_conteudo_basico(produto, categoria, tipo, site, link, idioma)
@@ -2280,7 +2574,8 @@ Sitemap: {self.site_url}/sitemap.xml
                 site_oficial=site,
                 link_afiliado=link,
                 idioma=idioma,
-                is_preland=(tipo == 'preland')
+                is_preland=(tipo == 'preland'),
+                sidebar_futuro=sidebar_futuro
             )
             
             if caminho:
@@ -2305,9 +2600,8 @@ if __name__ == "__main__":
             docs_dir.mkdir(exist_ok=True)
         
         # Verificar chave API
-        OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-        if OPENROUTER_API_KEY:
-            print(f"🔑 API Key detectada do .env")
+        if CHAVES_API:
+            print(f"🔑 API Key detectada do .env" + (f" ({len(CHAVES_API)} chaves)" if len(CHAVES_API) > 1 else ""))
         else:
             print("⚠️  AVISO: OPENROUTER_API_KEY não encontrada no .env")
             print("💡 Crie um arquivo .env na raiz com:")
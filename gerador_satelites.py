@@ -6,26 +6,39 @@ Versão Final: Gestão completa de satélites com correções e sitemap automát
 
 import os
 import re
-import requests
 import time
 import json
 import xml.etree.ElementTree as ET
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
 import shutil
 
+from cliente_openrouter import chamar_chat, MonitorArtigo
+from limitador_taxa import CHAVES_API
+from orcamento_tokens import ORCAMENTO, mostrar_orcamento
+from resiliencia import JANELA, mostrar_metricas, resumo_janela, workers_para_janela
+from roteador_modelos import ROTEADOR
+
 # Carrega variáveis do .env
 load_dotenv()
 
 # Configurações
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 MODEL = "deepseek/deepseek-chat"
 DOCS_DIR = Path.cwd() / "docs"
 SITEMAP_PATH = DOCS_DIR / "sitemap.xml"
 
+# O sitemap é lido e regravado inteiro; escritas concorrentes passam por aqui
+LOCK_SITEMAP = threading.Lock()
+
+# Satélites em geração ao mesmo tempo no modo pool (opção 'T'); sem valor no
+# .env, o bastante para a janela AIMD decidir quantas requisições ficam em voo
+SATELITES_SIMULTANEOS = int(os.getenv("SATELITES_SIMULTANEOS") or workers_para_janela(6))
+
+# O Authorization é preenchido pelo cliente com a chave escolhida no pool
 HEADERS = {
-    "Authorization": f"Bearer {OPENROUTER_API_KEY}",
     "Content-Type": "application/json",
     "HTTP-Referer": "http://localhost",
     "X-Title": "Gerador Satélites v3.0"
@@ -161,6 +174,14 @@ DESCRIPTION:
 
 ARTICLE:
 <conteúdo completo do article como mostrado acima>
+
+🧠 INSTRUÇÕES CRÍTICAS:
+1. INCLUA pelo menos 3 links diferentes para o review
+2. Use CTA claro na conclusão (com class="btn-review")
+3. Mencione o review no FAQ
+4. Texto mínimo 1800 palavras
+5. NÃO seja comercial - seja informativo
+6. INCLUA um CTA final com a classe "cta-final" e "btn-review"
 """
 
 def calcular_tempo_leitura(texto):
@@ -378,51 +399,60 @@ def criar_html_satelite(review_html, titulo, descricao, artigo_conteudo, categor
     
     return html_atualizado
 
-def atualizar_sitemap(categoria, produto_slug, tipo_satelite):
-    """Atualiza o sitemap.xml com o novo artigo satélite"""
+def atualizar_sitemap_lote(categoria, produto_slug, tipos_satelite):
+    """Atualiza o sitemap.xml com vários satélites do mesmo review de uma vez"""
     
-    if not SITEMAP_PATH.exists():
-        print("   ⚠️ Sitemap não encontrado, criando novo...")
-        criar_sitemap_inicial()
+    if not tipos_satelite:
+        return
     
-    try:
-        tree = ET.parse(SITEMAP_PATH)
-        root = tree.getroot()
-        
-        # Namespace do sitemap
-        ns = {'ns': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
-        
-        # URL do artigo satélite
-        url_satelite = f"https://topofertas.reviewnexus.blog/{categoria}/{produto_slug}-{tipo_satelite['slug']}/"
-        
-        # Verifica se já existe
-        urls_existentes = root.findall('.//ns:loc', ns)
-        for url_elem in urls_existentes:
-            if url_satelite in url_elem.text:
-                print(f"   🔍 URL já existe no sitemap")
-                return
-        
-        # Cria novo elemento URL
-        url_element = ET.SubElement(root, 'url')
-        
-        loc = ET.SubElement(url_element, 'loc')
-        loc.text = url_satelite
-        
-        lastmod = ET.SubElement(url_element, 'lastmod')
-        lastmod.text = datetime.now().strftime("%Y-%m-%d")
-        
-        changefreq = ET.SubElement(url_element, 'changefreq')
-        changefreq.text = "monthly"
-        
-        priority = ET.SubElement(url_element, 'priority')
-        priority.text = "0.7"
-        
-        # Salva o sitemap
-        tree.write(SITEMAP_PATH, encoding='utf-8', xml_declaration=True)
-        print(f"   ✅ Sitemap atualizado")
+    with LOCK_SITEMAP:
+        if not SITEMAP_PATH.exists():
+            print("   ⚠️ Sitemap não encontrado, criando novo...")
+            criar_sitemap_inicial()
         
-    except Exception as e:
-        print(f"   ⚠️ Erro ao atualizar sitemap: {e}")
+        try:
+            tree = ET.parse(SITEMAP_PATH)
+            root = tree.getroot()
+            
+            # Namespace do sitemap
+            ns = {'ns': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
+            
+            urls_existentes = [url_elem.text for url_elem in root.findall('.//ns:loc', ns)]
+            adicionadas = 0
+            
+            for tipo_satelite in tipos_satelite:
+                # URL do artigo satélite
+                url_satelite = f"https://topofertas.reviewnexus.blog/{categoria}/{produto_slug}-{tipo_satelite['slug']}/"
+                
+                # Verifica se já existe
+                if any(url_satelite in url for url in urls_existentes):
+                    print(f"   🔍 URL já existe no sitemap: {tipo_satelite['slug']}")
+                    continue
+                
+                # Cria novo elemento URL
+                url_element = ET.SubElement(root, 'url')
+                
+                loc = ET.SubElement(url_element, 'loc')
+                loc.text = url_satelite
+                
+                lastmod = ET.SubElement(url_element, 'lastmod')
+                lastmod.text = datetime.now().strftime("%Y-%m-%d")
+                
+                changefreq = ET.SubElement(url_element, 'changefreq')
+                changefreq.text = "monthly"
+                
+                priority = ET.SubElement(url_element, 'priority')
+                priority.text = "0.7"
+                
+                adicionadas += 1
+            
+            if adicionadas:
+                # Salva o sitemap
+                tree.write(SITEMAP_PATH, encoding='utf-8', xml_declaration=True)
+                print(f"   ✅ Sitemap atualizado ({adicionadas} URLs novas)")
+            
+        except Exception as e:
+            print(f"   ⚠️ Erro ao atualizar sitemap: {e}")
 
 def criar_sitemap_inicial():
     """Cria um sitemap.xml inicial"""
@@ -543,22 +573,22 @@ def corrigir_artigo_existente(caminho_artigo, review_url, produto_nome):
         print(f"   ❌ Erro ao corrigir: {e}")
         return False
 
-def processar_review(caminho_review, opcao_correcao=False):
-    """Processa um review e cria artigos satélite"""
+def carregar_contexto_review(caminho_review):
+    """Lê o review e monta os dados comuns aos seus satélites (ou None se inválido)"""
     
     try:
         with open(caminho_review, "r", encoding="utf-8") as f:
             review_html = f.read()
     except Exception as e:
         print(f"❌ Erro ao ler review: {e}")
-        return
+        return None
     
     caminho_rel = Path(caminho_review).relative_to(DOCS_DIR)
     partes = caminho_rel.parts
     
     if len(partes) != 3:
         print(f"⚠️ Pula: {caminho_rel} - estrutura inválida")
-        return
+        return None
     
     categoria = partes[0]
     produto_slug = partes[1]
@@ -568,7 +598,7 @@ def processar_review(caminho_review, opcao_correcao=False):
                      'css', 'js', 'img', 'assets', 'index.html']
     if categoria.lower() in pastas_ignorar or produto_slug.lower() in pastas_ignorar:
         print(f"⚠️ Pula: {caminho_rel} - pasta ignorada")
-        return
+        return None
     
     # Extrai nome do produto
     title_match = re.search(r"<title>(.*?)</title>", review_html, re.IGNORECASE)
@@ -579,8 +609,45 @@ def processar_review(caminho_review, opcao_correcao=False):
     else:
         produto_nome = produto_slug.replace("-", " ").title()
     
-    ano_atual = time.strftime("%Y")
-    link_review = f"../{produto_slug}/index.html"
+    # Lista de outros satélites para sidebar
+    outros_satelites_info = []
+    for sat in SATELLITE_TYPES:
+        outros_satelites_info.append({
+            'slug': sat['slug'],
+            'slug_completo': f"{produto_slug}-{sat['slug']}",
+            'nome': sat['nome']
+        })
+    
+    return {
+        'review_html': review_html,
+        'categoria': categoria,
+        'produto_slug': produto_slug,
+        'produto_nome': produto_nome,
+        'ano_atual': time.strftime("%Y"),
+        'link_review': f"../{produto_slug}/index.html",
+        'outros_satelites_info': outros_satelites_info
+    }
+
+def satelites_pendentes(contexto, incluir_existentes=False):
+    """Tipos de satélite do review que ainda não têm index.html"""
+    pendentes = []
+    for satelite in SATELLITE_TYPES:
+        arquivo_final = DOCS_DIR / contexto['categoria'] / f"{contexto['produto_slug']}-{satelite['slug']}" / "index.html"
+        if incluir_existentes or not arquivo_final.exists():
+            pendentes.append(satelite)
+    return pendentes
+
+def processar_review(caminho_review, opcao_correcao=False):
+    """Processa um review e cria artigos satélite"""
+    
+    contexto = carregar_contexto_review(caminho_review)
+    if not contexto:
+        return
+    
+    categoria = contexto['categoria']
+    produto_slug = contexto['produto_slug']
+    produto_nome = contexto['produto_nome']
+    link_review = contexto['link_review']
     
     print(f"\n🎯 PROCESSANDO: {produto_nome}")
     print(f"   📁 Categoria: {categoria}")
@@ -648,6 +715,7 @@ def processar_review(caminho_review, opcao_correcao=False):
                     corrigir_artigo_existente(info['caminho'], link_review, produto_nome)
     
     # Se todos já existem e não quer corrigir, pergunta
+    recriar = False
     if len(satelites_existentes) >= len(SATELLITE_TYPES) and not opcao_correcao:
         print(f"\n   ⚠️ Todos os satélites já existem")
         resposta = input("   Deseja recriar algum? (S/N): ").strip().upper()
@@ -663,6 +731,7 @@ def processar_review(caminho_review, opcao_correcao=False):
             
             if escolha == 'T':
                 # Remove todos para recriar
+                recriar = True
                 for sat in SATELLITE_TYPES:
                     slug_completo = f"{produto_slug}-{sat['slug']}"
                     pasta_satelite = DOCS_DIR / categoria / slug_completo
@@ -672,6 +741,7 @@ def processar_review(caminho_review, opcao_correcao=False):
             elif escolha.isdigit():
                 idx = int(escolha) - 1
                 if 0 <= idx < len(SATELLITE_TYPES):
+                    recriar = True
                     sat = SATELLITE_TYPES[idx]
                     slug_completo = f"{produto_slug}-{sat['slug']}"
                     pasta_satelite = DOCS_DIR / categoria / slug_completo
@@ -685,32 +755,131 @@ def processar_review(caminho_review, opcao_correcao=False):
             print(f"   ⏸️ Mantendo existentes, pulando...")
             return
     
-    # Prepara lista de outros satélites para sidebar
-    outros_satelites_info = []
-    for sat in SATELLITE_TYPES:
-        outros_satelites_info.append({
-            'slug': sat['slug'],
-            'slug_completo': f"{produto_slug}-{sat['slug']}",
-            'nome': sat['nome']
-        })
-    
-    # Cria cada satélite
-    satelites_criados = 0
-    for satelite in SATELLITE_TYPES:
-        slug_completo = f"{produto_slug}-{satelite['slug']}"
-        pasta_destino = DOCS_DIR / categoria / slug_completo
-        arquivo_final = pasta_destino / "index.html"
+    # Satélites a criar (os três prompts são independentes); em modo
+    # correção os existentes também são refeitos. Recriar ou refazer não
+    # pode devolver o mesmo artigo do cache da IA.
+    usar_cache = not (recriar or opcao_correcao)
+    pendentes = satelites_pendentes(contexto, incluir_existentes=opcao_correcao)
+    
+    if not pendentes:
+        return 0
+    
+    # Dispara todas as chamadas de uma vez e salva cada satélite quando termina
+    print(f"\n   🛰️ Gerando {len(pendentes)} satélites em paralelo...")
+    criados = []
+    with ThreadPoolExecutor(max_workers=len(pendentes)) as executor:
+        futuros = {
+            executor.submit(gerar_satelite, satelite, contexto, usar_cache=usar_cache): satelite
+            for satelite in pendentes
+        }
         
-        # Se já existe e não estamos em modo correção, pula
-        if arquivo_final.exists() and not opcao_correcao:
+        for futuro in as_completed(futuros):
+            satelite = futuros[futuro]
+            try:
+                if futuro.result():
+                    criados.append(satelite)
+            except Exception as e:
+                print(f"   ❌ Erro em {satelite['nome']}: {e}")
+    
+    # Sitemap atualizado uma única vez por review
+    atualizar_sitemap_lote(categoria, produto_slug, criados)
+    
+    return len(criados)
+
+def processar_reviews_em_pool(reviews, workers):
+    """Mantém N satélites em geração ao mesmo tempo, atravessando reviews
+    
+    Satélites já existentes são pulados sem perguntar. O ritmo de
+    requisições é o do pool de chaves compartilhado do cliente_openrouter; no
+    lugar dos prints por etapa, mostra uma linha de progresso com
+    vazão e ETA.
+    """
+    tarefas = []
+    restantes = {}
+    for review in reviews:
+        contexto = carregar_contexto_review(review['caminho'])
+        if not contexto:
             continue
+        pendentes = satelites_pendentes(contexto)
+        if pendentes:
+            restantes[review['caminho']] = len(pendentes)
+            for satelite in pendentes:
+                tarefas.append((review['caminho'], contexto, satelite))
+    
+    total = len(tarefas)
+    print(f"\n🛰️ {total} satélites pendentes em {len(restantes)} reviews ({workers} simultâneos)")
+    if not total:
+        return 0
+    
+    criados_por_review = {caminho: [] for caminho in restantes}
+    concluidos = 0
+    criados = 0
+    inicio = time.monotonic()
+    
+    def mostrar_progresso():
+        decorrido = time.monotonic() - inicio
+        por_minuto = concluidos / decorrido * 60 if decorrido > 0 else 0
+        eta = (total - concluidos) / por_minuto if por_minuto > 0 else 0
+        # Com a janela AIMD, quem limita as chamadas em voo é ela, não o pool
+        em_voo = JANELA.em_voo if JANELA else min(workers, total - concluidos)
+        print(f"\r   ⏳ {concluidos}/{total} | ✅ {criados} | {por_minuto:.1f} satélites/min | "
+              f"ETA {eta:.0f} min | em andamento: {em_voo}{resumo_janela()}   ", end="", flush=True)
+    
+    mostrar_progresso()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="satelite") as executor:
+        futuros = {
+            executor.submit(gerar_satelite, satelite, contexto, verbose=False): (caminho, contexto, satelite)
+            for caminho, contexto, satelite in tarefas
+        }
         
-        print(f"\n   🛰️ Criando: {satelite['nome']}")
-        print(f"   📂 Pasta: {categoria}/{slug_completo}/")
-        
-        # Prompt personalizado
-        prompt_personalizado = PROMPT_SATELITE + f"""
+        for futuro in as_completed(futuros):
+            caminho, contexto, satelite = futuros[futuro]
+            try:
+                if futuro.result():
+                    criados_por_review[caminho].append(satelite)
+                    criados += 1
+            except Exception as e:
+                print(f"\n   ❌ Erro em {contexto['produto_slug']}-{satelite['slug']}: {e}")
+            concluidos += 1
+            
+            # Review completo: sitemap atualizado uma única vez
+            restantes[caminho] -= 1
+            if restantes[caminho] == 0:
+                atualizar_sitemap_lote(contexto['categoria'], contexto['produto_slug'], criados_por_review[caminho])
+            
+            mostrar_progresso()
+    
+    print()
+    duracao = time.monotonic() - inicio
+    print(f"   ⏱️ {criados} satélites em {duracao / 60:.1f} min ({concluidos / max(duracao, 1) * 60:.1f}/min)")
+    return criados
 
+def gerar_satelite(satelite, contexto, verbose=True, usar_cache=True):
+    """Gera, renderiza e salva um satélite; retorna True se o arquivo foi salvo
+    
+    Com verbose=False só os erros são impressos (usado no modo pool).
+    usar_cache=False pede um texto novo à IA (recriação pedida pelo usuário).
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+    
+    review_html = contexto['review_html']
+    categoria = contexto['categoria']
+    produto_slug = contexto['produto_slug']
+    produto_nome = contexto['produto_nome']
+    ano_atual = contexto['ano_atual']
+    link_review = contexto['link_review']
+    outros_satelites_info = contexto['outros_satelites_info']
+    
+    slug_completo = f"{produto_slug}-{satelite['slug']}"
+    pasta_destino = DOCS_DIR / categoria / slug_completo
+    arquivo_final = pasta_destino / "index.html"
+    
+    log(f"\n   🛰️ Criando: {satelite['nome']}")
+    log(f"   📂 Pasta: {categoria}/{slug_completo}/")
+    
+    # Prompt personalizado: PROMPT_SATELITE fica intacto no início (cache de
+    # prefixo do provedor) e só os dados deste satélite vêm depois
+    prompt_personalizado = ORCAMENTO.montar_prompt('satelite', PROMPT_SATELITE, f"""
 🎯 INFORMAÇÕES ESPECÍFICAS:
 
 PRODUTO: {produto_nome}
@@ -722,64 +891,52 @@ ANO: {ano_atual}
 📎 LINK DO REVIEW (USE 3-4 VEZES):
 <a href="{link_review}">Review completo do {produto_nome}</a>
 
-🧠 INSTRUÇÕES CRÍTICAS:
-1. INCLUA pelo menos 3 links diferentes para o review
-2. Use CTA claro na conclusão (com class="btn-review")
-3. Mencione o review no FAQ
-4. Texto mínimo 1800 palavras
-5. NÃO seja comercial - seja informativo
-6. INCLUA um CTA final com a classe "cta-final" e "btn-review"
-
 CRIE um artigo ORIGINAL sobre "{satelite['intent'].lower()}" para {produto_nome}.
 O artigo deve naturalmente levar o leitor ao review principal.
-"""
-        
-        try:
-            payload = {
-                "model": MODEL,
-                "messages": [
-                    {"role": "system", "content": "Você é um redator especialista em conteúdo informativo para blogs. Seu foco é educar e informar, não vender. Crie conteúdo que naturalmente leve ao review principal."},
-                    {"role": "user", "content": prompt_personalizado}
-                ],
-                "temperature": 0.7,
-                "max_tokens": 6000
-            }
-            
-            print(f"   🤖 Chamando IA...")
-            response = requests.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers=HEADERS,
-                json=payload,
-                timeout=300
-            )
-            response.raise_for_status()
-            resultado = response.json()["choices"][0]["message"]["content"]
-            
-        except Exception as e:
-            print(f"   ❌ Erro na IA: {e}")
-            continue
+""")
+    
+    try:
+        payload = {
+            "model": MODEL,
+            "messages": [
+                {"role": "system", "content": "Você é um redator especialista em conteúdo informativo para blogs. Seu foco é educar e informar, não vender. Crie conteúdo que naturalmente leve ao review principal."},
+                {"role": "user", "content": prompt_personalizado}
+            ],
+            "temperature": 0.7,
+            "max_tokens": ORCAMENTO.max_tokens('satelite', 6000)
+        }
         
-        # Salva resposta bruta
-        debug_dir = Path("debug")
-        debug_dir.mkdir(exist_ok=True)
-        debug_file = debug_dir / f"{slug_completo}_raw.txt"
-        with open(debug_file, "w", encoding="utf-8") as f:
-            f.write(resultado)
+        log(f"   🤖 Chamando IA...")
+        resposta = chamar_chat(payload, HEADERS, timeout=300, usar_cache=usar_cache, parar_em="</article>",
+                               validar=MonitorArtigo(mostrar=verbose, exigir_article=False),
+                               etapa='satelite', slug=slug_completo)
+        resultado = resposta["choices"][0]["message"]["content"]
         
-        # Processa resposta
-        titulo, descricao, artigo_conteudo = processar_resposta_ia(resultado, link_review, produto_slug, produto_nome)
+    except Exception as e:
+        print(f"   ❌ Erro na IA ({satelite['nome']}): {e}")
+        return False
+    
+    # Salva resposta bruta
+    debug_dir = Path("debug")
+    debug_dir.mkdir(exist_ok=True)
+    debug_file = debug_dir / f"{slug_completo}_raw.txt"
+    with open(debug_file, "w", encoding="utf-8") as f:
+        f.write(resultado)
+    
+    # Processa resposta
+    titulo, descricao, artigo_conteudo = processar_resposta_ia(resultado, link_review, produto_slug, produto_nome)
+    
+    if not artigo_conteudo:
+        print(f"   ❌ Não extraiu conteúdo válido ({slug_completo})")
         
-        if not artigo_conteudo:
-            print(f"   ❌ Não extraiu conteúdo válido")
+        # Tenta fallback
+        log(f"   🔍 Tentando fallback...")
+        try:
+            # Extrai conteúdo da resposta bruta
+            artigo_conteudo = resultado
             
-            # Tenta fallback
-            print(f"   🔍 Tentando fallback...")
-            try:
-                # Extrai conteúdo da resposta bruta
-                artigo_conteudo = resultado
-                
-                # Adiciona estrutura básica
-                artigo_conteudo = f'''<article class="content">
+            # Adiciona estrutura básica
+            artigo_conteudo = f'''<article class="content">
     <h1>{produto_nome} {satelite['nome']} - Análise Completa {ano_atual}</h1>
     
     <div class="article-meta">
@@ -797,72 +954,63 @@ O artigo deve naturalmente levar o leitor ao review principal.
         <a href="{link_review}" class="btn-review">Leia nosso Review Completo</a></p>
     </div>
 </article>'''
-                
-                titulo = satelite['title_hint'].replace("{PRODUTO}", produto_nome).replace("{CATEGORIA}", categoria).replace("{ANO_ATUAL}", ano_atual)
-                descricao = f"Análise completa sobre {produto_nome}. Descubra se vale a pena. Leia nosso review detalhado para mais informações."
-                
-            except Exception as e2:
-                print(f"   ❌ Fallback falhou: {e2}")
-                continue
-        
-        # Garante título se vazio
-        if not titulo or len(titulo) < 10:
+            
             titulo = satelite['title_hint'].replace("{PRODUTO}", produto_nome).replace("{CATEGORIA}", categoria).replace("{ANO_ATUAL}", ano_atual)
+            descricao = f"Análise completa sobre {produto_nome}. Descubra se vale a pena. Leia nosso review detalhado para mais informações."
+            
+        except Exception as e2:
+            print(f"   ❌ Fallback falhou: {e2}")
+            return False
+    
+    # Garante título se vazio
+    if not titulo or len(titulo) < 10:
+        titulo = satelite['title_hint'].replace("{PRODUTO}", produto_nome).replace("{CATEGORIA}", categoria).replace("{ANO_ATUAL}", ano_atual)
+    
+    # Limpa título
+    titulo = re.sub(r'\*\*(.*?)\*\*', r'\1', titulo).strip()
+    titulo = re.sub(r'<[^>]+>', '', titulo)
+    
+    # Remove asteriscos do início
+    titulo = re.sub(r'^\*\s*', '', titulo)
+    
+    log(f"   📝 Título: {titulo[:80]}...")
+    log(f"   📊 Conteúdo: {len(artigo_conteudo)} caracteres")
+    
+    # Conta links para review
+    links_review = len(re.findall(rf'href=["\'][^"\']*{re.escape(link_review)}[^"\']*["\']', artigo_conteudo))
+    log(f"   📎 Links para review: {links_review}")
+    
+    # Verifica se tem CTA final
+    tem_cta_final = 'cta-final' in artigo_conteudo.lower() or 'btn-review' in artigo_conteudo.lower()
+    log(f"   🎯 CTA final: {'✅ Sim' if tem_cta_final else '❌ Não'}")
+    
+    # Cria HTML completo
+    html_final = criar_html_satelite(review_html, titulo, descricao, artigo_conteudo, 
+                                    categoria, produto_slug, produto_nome, satelite, outros_satelites_info, link_review)
+    
+    if not html_final:
+        print(f"   ❌ Erro ao criar HTML")
+        return False
+    
+    # Cria diretório e salva
+    pasta_destino.mkdir(parents=True, exist_ok=True)
+    
+    try:
+        with open(arquivo_final, "w", encoding="utf-8") as f:
+            f.write(html_final)
         
-        # Limpa título
-        titulo = re.sub(r'\*\*(.*?)\*\*', r'\1', titulo).strip()
-        titulo = re.sub(r'<[^>]+>', '', titulo)
-        
-        # Remove asteriscos do início
-        titulo = re.sub(r'^\*\s*', '', titulo)
-        
-        print(f"   📝 Título: {titulo[:80]}...")
-        print(f"   📊 Conteúdo: {len(artigo_conteudo)} caracteres")
-        
-        # Conta links para review
-        links_review = len(re.findall(rf'href=["\'][^"\']*{re.escape(link_review)}[^"\']*["\']', artigo_conteudo))
-        print(f"   📎 Links para review: {links_review}")
-        
-        # Verifica se tem CTA final
-        tem_cta_final = 'cta-final' in artigo_conteudo.lower() or 'btn-review' in artigo_conteudo.lower()
-        print(f"   🎯 CTA final: {'✅ Sim' if tem_cta_final else '❌ Não'}")
-        
-        # Cria HTML completo
-        html_final = criar_html_satelite(review_html, titulo, descricao, artigo_conteudo, 
-                                        categoria, produto_slug, produto_nome, satelite, outros_satelites_info, link_review)
-        
-        if not html_final:
-            print(f"   ❌ Erro ao criar HTML")
-            continue
-        
-        # Cria diretório e salva
-        pasta_destino.mkdir(parents=True, exist_ok=True)
+        # Verifica tamanho
+        with open(arquivo_final, "r", encoding="utf-8") as f:
+            conteudo = f.read()
+            palavras = len(conteudo.split())
         
-        try:
-            with open(arquivo_final, "w", encoding="utf-8") as f:
-                f.write(html_final)
-            
-            # Verifica tamanho
-            with open(arquivo_final, "r", encoding="utf-8") as f:
-                conteudo = f.read()
-                palavras = len(conteudo.split())
-            
-            print(f"   ✅ SALVO: {slug_completo}/index.html")
-            print(f"   📈 Estatísticas: {palavras} palavras, {links_review} links para review")
-            
-            # Atualiza sitemap
-            atualizar_sitemap(categoria, produto_slug, satelite)
-            
-            satelites_criados += 1
-            
-        except Exception as e:
-            print(f"   ❌ Erro ao salvar: {e}")
-            continue
+        log(f"   ✅ SALVO: {slug_completo}/index.html")
+        log(f"   📈 Estatísticas: {palavras} palavras, {links_review} links para review")
+        return True
         
-        print(f"   ⏳ Aguardando 5 segundos...")
-        time.sleep(5)
-    
-    return satelites_criados
+    except Exception as e:
+        print(f"   ❌ Erro ao salvar: {e}")
+        return False
 
 def encontrar_reviews():
     """Encontra todos os reviews"""
@@ -1279,14 +1427,14 @@ def main():
     print("📊 VERSÃO FINAL: Gestão completa com correções e sitemap automático")
     print("=" * 70)
     
-    if not OPENROUTER_API_KEY:
+    if not CHAVES_API:
         print("❌ ERRO: OPENROUTER_API_KEY não encontrada")
         print("🔑 Crie um arquivo .env com: OPENROUTER_API_KEY=sua_chave_aqui")
         exit(1)
     
-    print("✅ API Key carregada do .env")
+    print("✅ API Key carregada do .env" + (f" ({len(CHAVES_API)} chaves)" if len(CHAVES_API) > 1 else ""))
     print(f"📁 Diretório base: {DOCS_DIR}")
-    print(f"🤖 Modelo: {MODEL}")
+    print(f"🤖 Modelo: {ROTEADOR.descrever('satelite') or MODEL}")
     print(f"🎯 Artigos por produto: {len(SATELLITE_TYPES)} (Otimizado)")
     print("🔑 Sistema 11/10 - Gestão completa com correções automáticas")
     
@@ -1369,18 +1517,26 @@ def main():
     total_criados = 0
     total_corrigidos = 0
     
-    for i, review in enumerate(reviews_selecionados, 1):
-        print(f"\n{'='*70}")
-        print(f"[{i}/{len(reviews_selecionados)}] PROCESSANDO REVIEW")
-        print(f"Produto: {review['nome']}")
-        print(f"Categoria: {review['categoria']}")
-        print(f"{'='*70}")
-        
-        criados = processar_review(review['caminho'])
-        if criados:
-            total_criados += criados
-        
-        print(f"   📊 Satélites processados: {criados if criados else 0}")
+    workers = 1
+    if escolha_reviews == 'T':
+        resposta = input(f"Satélites simultâneos (Enter = {SATELITES_SIMULTANEOS}): ").strip()
+        workers = int(resposta) if resposta.isdigit() and int(resposta) > 0 else SATELITES_SIMULTANEOS
+    
+    if workers > 1:
+        total_criados = processar_reviews_em_pool(reviews_selecionados, workers)
+    else:
+        for i, review in enumerate(reviews_selecionados, 1):
+            print(f"\n{'='*70}")
+            print(f"[{i}/{len(reviews_selecionados)}] PROCESSANDO REVIEW")
+            print(f"Produto: {review['nome']}")
+            print(f"Categoria: {review['categoria']}")
+            print(f"{'='*70}")
+            
+            criados = processar_review(review['caminho'])
+            if criados:
+                total_criados += criados
+            
+            print(f"   📊 Satélites processados: {criados if criados else 0}")
     
     # Relatório final
     print(f"\n{'='*70}")
@@ -1392,6 +1548,8 @@ def main():
     print(f"   Artigos satélite criados: {total_criados}")
     if len(reviews_selecionados) > 0:
         print(f"   Média: {total_criados/len(reviews_selecionados):.1f} por review")
+    mostrar_metricas()
+    mostrar_orcamento()
     
     # Verifica sitemap final
     if SITEMAP_PATH.exists():
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+LIMITADOR DE TAXA - Token bucket para requisições/minuto e tokens/minuto
+Cada chave de API do pool tem seus próprios baldes; a requisição vai para a
+chave com mais orçamento sobrando, então várias chaves somam vazão
+"""
+
+import os
+import threading
+import time
+
+# Limites do provedor (sobrescrevíveis pelo .env); 0 desativa o limite
+OPENROUTER_RPM = float(os.getenv("OPENROUTER_RPM", "60"))
+OPENROUTER_TPM = float(os.getenv("OPENROUTER_TPM", "0"))
+
+# Quantas requisições podem sair de uma vez quando o balde está cheio
+OPENROUTER_RAJADA = float(os.getenv("OPENROUTER_RAJADA", "5"))
+
+# Chaves de API: OPENROUTER_API_KEYS=chave1,chave2 e/ou OPENROUTER_API_KEY
+# (os limites acima valem para cada chave)
+CHAVES_API = list(dict.fromkeys(
+    chave.strip()
+    for chave in os.getenv("OPENROUTER_API_KEYS", "").split(",") + [os.getenv("OPENROUTER_API_KEY", "")]
+    if chave.strip()
+))
+
+# Quarentena de chaves: recusada (401/402/403) e limitada (429) sem Retry-After
+QUARENTENA_RECUSADA = float(os.getenv("OPENROUTER_QUARENTENA_RECUSADA", "3600"))
+# A pausa do 429 dobra a cada 429 seguido, sem passar do teto do backoff
+QUARENTENA_429 = 30.0
+QUARENTENA_429_MAX = float(os.getenv("OPENROUTER_BACKOFF_MAX", "60"))
+
+
+class BaldeTokens:
+    """Balde que reabastece continuamente até a capacidade máxima"""
+
+    def __init__(self, capacidade, por_minuto):
+        self.capacidade = capacidade
+        self.por_segundo = por_minuto / 60.0
+        self.disponivel = capacidade
+        self.atualizado = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _reabastecer(self):
+        agora = time.monotonic()
+        self.disponivel = min(self.capacidade, self.disponivel + (agora - self.atualizado) * self.por_segundo)
+        self.atualizado = agora
+
+    def previsao(self, quantidade):
+        """Segundos até a quantidade estar disponível, sem debitar"""
+        quantidade = min(quantidade, self.capacidade)
+        with self.lock:
+            self._reabastecer()
+            falta = quantidade - self.disponivel
+        return max(0.0, falta / self.por_segundo) if self.por_segundo else 0.0
+
+    def reservar(self, quantidade):
+        """Debita a quantidade e retorna quantos segundos esperar até ela existir
+
+        O saldo pode ficar negativo: quem chega depois espera a dívida ser paga,
+        o que mantém a ordem de chegada entre threads.
+        """
+        quantidade = min(quantidade, self.capacidade)
+        with self.lock:
+            self._reabastecer()
+            self.disponivel -= quantidade
+            if self.disponivel >= 0:
+                return 0.0
+            return -self.disponivel / self.por_segundo
+
+    def devolver(self, quantidade):
+        """Credita (ou debita, se negativo) um ajuste sem bloquear"""
+        with self.lock:
+            self._reabastecer()
+            self.disponivel = min(self.capacidade, self.disponivel + quantidade)
+
+    def esvaziar(self, segundos):
+        """Zera o balde e adia o reabastecimento (usado após um 429)"""
+        with self.lock:
+            self._reabastecer()
+            self.disponivel = min(self.disponivel, -segundos * self.por_segundo)
+
+
+class LimitadorTaxa:
+    """Combina um balde de requisições e um de tokens por minuto"""
+
+    def __init__(self, rpm, tpm, rajada=1):
+        self.requisicoes = BaldeTokens(max(1.0, rajada), rpm) if rpm > 0 else None
+        self.tokens = BaldeTokens(tpm, tpm) if tpm > 0 else None
+
+    def adquirir(self, tokens_estimados=0):
+        """Bloqueia até haver orçamento para uma requisição; retorna a espera em segundos"""
+        espera = self.reservar(tokens_estimados)
+        if espera > 0:
+            time.sleep(espera)
+        return espera
+
+    def reservar(self, tokens_estimados=0):
+        """Debita uma requisição sem bloquear; retorna quanto esperar antes de enviar"""
+        espera = 0.0
+        if self.requisicoes:
+            espera = max(espera, self.requisicoes.reservar(1))
+        if self.tokens and tokens_estimados:
+            espera = max(espera, self.tokens.reservar(tokens_estimados))
+        return espera
+
+    def previsao(self, tokens_estimados=0):
+        """Espera que uma requisição teria agora, sem debitar"""
+        espera = 0.0
+        if self.requisicoes:
+            espera = max(espera, self.requisicoes.previsao(1))
+        if self.tokens and tokens_estimados:
+            espera = max(espera, self.tokens.previsao(tokens_estimados))
+        return espera
+
+    def ajustar_tokens(self, estimados, reais):
+        """Corrige o balde de tokens com o consumo real informado em usage"""
+        if self.tokens and reais:
+            self.tokens.devolver(estimados - reais)
+
+    def penalizar(self, segundos):
+        """Pausa novas requisições após o provedor responder 429"""
+        if self.requisicoes:
+            self.requisicoes.esvaziar(segundos)
+
+
+def estimar_tokens(payload):
+    """Estimativa grosseira de tokens (4 caracteres por token + max_tokens)"""
+    caracteres = sum(len(m.get("content") or "") for m in payload.get("messages", []))
+    return caracteres // 4 + payload.get("max_tokens", 0)
+
+
+class ChaveApi:
+    """Uma chave do pool com seu limitador, quarentena e estatísticas"""
+
+    def __init__(self, chave):
+        self.chave = chave
+        self.limitador = LimitadorTaxa(OPENROUTER_RPM, OPENROUTER_TPM, OPENROUTER_RAJADA)
+        self.quarentena_ate = 0.0
+        self.seguidas_429 = 0
+        self.em_voo = 0
+        self.stats = {'requisicoes': 0, 'ok': 0, 'erros': 0, '429': 0, 'tokens': 0, 'latencia': 0.0}
+
+    @property
+    def nome(self):
+        """Chave mascarada para logs"""
+        if not self.chave:
+            return "(sem chave)"
+        return f"{self.chave[:8]}…{self.chave[-4:]}"
+
+
+class PoolChaves:
+    """Distribui as requisições entre as chaves pelo orçamento que resta em cada uma
+
+    Chaves recusadas (401/402/403) ou limitadas (429) ficam em quarentena;
+    sem nenhuma chave configurada o pool tem uma entrada vazia e o cabeçalho
+    de quem chamou é usado como está.
+    """
+
+    def __init__(self, chaves):
+        self.chaves = [ChaveApi(chave) for chave in chaves] or [ChaveApi(None)]
+        self.lock = threading.Lock()
+        self.inicio = time.monotonic()
+
+    def adquirir(self, tokens_estimados=0):
+        """Escolhe a chave, reserva o orçamento nela e espera o necessário"""
+        while True:
+            with self.lock:
+                agora = time.monotonic()
+                ativas = [c for c in self.chaves if c.quarentena_ate <= agora]
+                if ativas:
+                    escolhida = min(ativas, key=lambda c: (c.limitador.previsao(tokens_estimados), c.em_voo))
+                    espera = escolhida.limitador.reservar(tokens_estimados)
+                    escolhida.em_voo += 1
+                    escolhida.stats['requisicoes'] += 1
+                    break
+                pausa = min(c.quarentena_ate for c in self.chaves) - agora
+            print(f"   🔑 Todas as chaves em quarentena; aguardando {pausa:.0f}s")
+            time.sleep(pausa)
+
+        if espera > 0:
+            time.sleep(espera)
+        return escolhida
+
+    def liberar(self, chave, status, latencia=0.0, tokens=0, retry_after=None):
+        """Devolve a chave com o resultado da requisição
+
+        Retorna True quando a chave foi recusada e saiu de rotação.
+        """
+        with self.lock:
+            chave.em_voo -= 1
+            chave.stats['latencia'] += latencia
+            if status == 200:
+                chave.stats['ok'] += 1
+                chave.stats['tokens'] += tokens or 0
+                chave.seguidas_429 = 0
+                return False
+
+            chave.stats['erros'] += 1
+            if status in (401, 402, 403):
+                # A última chave ativa não sai de rotação: o erro chega a quem chamou
+                agora = time.monotonic()
+                if not any(c is not chave and c.quarentena_ate <= agora for c in self.chaves):
+                    return False
+                chave.quarentena_ate = time.monotonic() + QUARENTENA_RECUSADA
+                print(f"   🔑 Chave {chave.nome} recusada (HTTP {status}): fora de rotação por {QUARENTENA_RECUSADA / 60:.0f} min")
+                return True
+            if status == 429:
+                chave.stats['429'] += 1
+                chave.seguidas_429 += 1
+                pausa = retry_after or min(QUARENTENA_429 * 2 ** (chave.seguidas_429 - 1), QUARENTENA_429_MAX)
+                chave.limitador.penalizar(pausa)
+                # Com uma só chave ativa, basta a pausa do balde (como o backoff do retry)
+                agora = time.monotonic()
+                if any(c is not chave and c.quarentena_ate <= agora for c in self.chaves):
+                    chave.quarentena_ate = agora + min(pausa, QUARENTENA_RECUSADA)
+            return False
+
+    def mostrar(self):
+        """Vazão e erros por chave (só quando há mais de uma)"""
+        if len(self.chaves) < 2:
+            return
+        minutos = max((time.monotonic() - self.inicio) / 60, 1 / 60)
+        print(f"\n🔑 CHAVES DE API: {len(self.chaves)}")
+        for c in self.chaves:
+            s = c.stats
+            print(f"   {c.nome:<14} {s['requisicoes']:>5} req ({s['requisicoes'] / minutos:.1f}/min) | ok {s['ok']} | "
+                  f"429 {s['429']} | erros {s['erros']} | {s['tokens'] / minutos:.0f} tokens/min")
+
+
+POOL_CHAVES = PoolChaves(CHAVES_API)
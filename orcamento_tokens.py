@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+ORÇAMENTO DE TOKENS - max_tokens aprendido e tamanho dos prompts por tipo de chamada
+Guarda o tamanho real das respostas e passa a pedir só o necessário
+(p95 do histórico + margem), sem nunca passar do valor fixo original.
+Os prompts são montados como prefixo estático + dados, o que permite o
+cache de prefixo do provedor, e os dados são compactados/cortados para
+caber no orçamento de entrada.
+
+Comparar duas cassetes gravadas (ex.: antes e depois de mudar os prompts):
+
+    python orcamento_tokens.py base.jsonl.gz nova.jsonl.gz
+"""
+
+import gzip
+import json
+import math
+import os
+import re
+import statistics
+import sys
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+# Configurações (sobrescrevíveis pelo .env)
+ORCAMENTO_ARQUIVO = Path(os.getenv("ORCAMENTO_TOKENS_ARQUIVO", Path(__file__).parent / "orcamento_tokens.json"))
+ORCAMENTO_DESATIVADO = os.getenv("ORCAMENTO_TOKENS_DESATIVADO", "").strip().lower() in ("1", "true", "s", "sim")
+
+# Amostras necessárias antes de mexer no max_tokens e quantas guardar por tipo
+AMOSTRAS_MINIMAS = 10
+AMOSTRAS_MAXIMAS = 200
+
+# Folga sobre o p95 e piso do orçamento aprendido
+MARGEM = 1.25
+MINIMO_TOKENS = 256
+
+# O arquivo é regravado a cada N registros (e no relatório)
+SALVAR_A_CADA = 10
+
+# Orçamento de entrada por chamada (tokens estimados do prompt inteiro)
+PROMPT_MAX_TOKENS = int(os.getenv("OPENROUTER_PROMPT_MAX_TOKENS", "12000"))
+
+
+def contar_tokens(texto):
+    """Estimativa de tokens (4 caracteres por token, como no limitador_taxa)"""
+    return len(texto) // 4
+
+
+def compactar(texto):
+    """Remove espaço que não muda o sentido: indentação, fim de linha e linhas vazias repetidas"""
+    texto = re.sub(r"[ \t]+\n", "\n", texto)
+    texto = re.sub(r"\n[ \t]+", "\n", texto)
+    texto = re.sub(r"<!--.*?-->", "", texto, flags=re.DOTALL)
+    return re.sub(r"\n{3,}", "\n\n", texto).strip()
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) por interpolação linear"""
+    if not valores:
+        return 0
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p / 100
+    baixo = int(posicao)
+    alto = min(baixo + 1, len(ordenados) - 1)
+    return ordenados[baixo] + (ordenados[alto] - ordenados[baixo]) * (posicao - baixo)
+
+
+class OrcamentoTokens:
+    """Histórico de tokens de saída por etapa (review, satelite, sidebar...)"""
+
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self.lock = threading.Lock()
+        self.amostras = {}
+        self.padroes = {}
+        self.sessao = {}
+        self.prompts = {}
+        self._pendentes = 0
+        self._carregar()
+
+    def _carregar(self):
+        try:
+            with open(self.arquivo, 'r', encoding='utf-8') as f:
+                self.amostras = json.load(f).get('amostras', {})
+        except (OSError, ValueError):
+            self.amostras = {}
+
+    def salvar(self):
+        with self.lock:
+            dados = {'amostras': self.amostras}
+            self._pendentes = 0
+        tmp = self.arquivo.with_suffix('.tmp')
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(dados, f)
+            os.replace(tmp, self.arquivo)
+        except OSError as e:
+            print(f"   ⚠️ Erro ao salvar orçamento de tokens: {e}")
+
+    def max_tokens(self, etapa, padrao):
+        """max_tokens para a etapa: aprendido do histórico, limitado ao padrão"""
+        with self.lock:
+            self.padroes[etapa] = padrao
+            amostras = list(self.amostras.get(etapa, []))
+
+        if ORCAMENTO_DESATIVADO or len(amostras) < AMOSTRAS_MINIMAS:
+            return padrao
+
+        aprendido = math.ceil(percentil(amostras, 95) * MARGEM / 100) * 100
+        return int(min(padrao, max(MINIMO_TOKENS, aprendido)))
+
+    def registrar(self, etapa, payload, resultado, latencia):
+        """Guarda o tamanho da resposta e acumula a economia da sessão"""
+        if not etapa:
+            return
+
+        escolha = (resultado.get("choices") or [{}])[0]
+        conteudo = (escolha.get("message") or {}).get("content") or ""
+        usage = resultado.get("usage") or {}
+        # Sem usage (streaming interrompido), estima 4 caracteres por token
+        tokens_saida = usage.get("completion_tokens") or len(conteudo) // 4
+        max_tokens = payload.get("max_tokens", 0)
+        truncada = escolha.get("finish_reason") == "length"
+
+        # Resposta cortada não mostra o tamanho real: registra acima do limite
+        # para o orçamento voltar a crescer
+        amostra = int(max_tokens * 1.5) if truncada and max_tokens else tokens_saida
+
+        with self.lock:
+            fila = self.amostras.setdefault(etapa, [])
+            fila.append(amostra)
+            del fila[:-AMOSTRAS_MAXIMAS]
+
+            s = self.sessao.setdefault(etapa, {
+                'chamadas': 0, 'tokens_saida': 0, 'reservados_economizados': 0,
+                'paradas': 0, 'truncadas': 0, 'latencia': 0.0
+            })
+            s['chamadas'] += 1
+            s['tokens_saida'] += tokens_saida
+            s['reservados_economizados'] += max(0, self.padroes.get(etapa, max_tokens) - max_tokens)
+            s['paradas'] += 1 if payload.get("stop") and escolha.get("finish_reason") == "stop" else 0
+            s['truncadas'] += 1 if truncada else 0
+            s['latencia'] += latencia
+
+            self._pendentes += 1
+            salvar = self._pendentes >= SALVAR_A_CADA
+
+        if salvar:
+            self.salvar()
+
+    def montar_prompt(self, etapa, prefixo, dados, cortavel=False, limite=None, compactar_dados=True):
+        """Junta o prefixo estático (intocado, para o cache do provedor) com os dados
+        
+        Os dados são compactados (a menos que compactar_dados seja False,
+        quando a IA precisa citar trechos exatos); se ainda passarem do
+        orçamento e cortavel for True, o final deles é cortado numa quebra de
+        linha. Sem cortavel, só avisa (cortar um artigo a refinar perderia conteúdo).
+        """
+        limite = limite or PROMPT_MAX_TOKENS
+        tokens_originais = contar_tokens(dados)
+        dados = compactar(dados) if compactar_dados else dados.strip()
+
+        sobra = limite - contar_tokens(prefixo)
+        if contar_tokens(dados) > sobra:
+            if cortavel and sobra > 0:
+                dados = dados[:sobra * 4].rsplit("\n", 1)[0] + "\n[...]"
+                print(f"   ✂️ Prompt de {etapa} cortado para caber em {limite} tokens")
+            else:
+                print(f"   ⚠️ Prompt de {etapa} com ~{contar_tokens(prefixo) + contar_tokens(dados)} tokens, acima do orçamento de {limite}")
+
+        with self.lock:
+            p = self._estatisticas_prompt(etapa)
+            p['montagens'] += 1
+            p['prefixo'] += contar_tokens(prefixo)
+            p['dados'] += contar_tokens(dados)
+            p['economizados'] += max(0, tokens_originais - contar_tokens(dados))
+
+        return prefixo.rstrip() + "\n\n" + dados
+
+    def registrar_prompt(self, etapa, usage):
+        """Soma os tokens de entrada reais (e os servidos do cache de prefixo)"""
+        if not etapa or not usage:
+            return
+        detalhes = usage.get("prompt_tokens_details") or {}
+        with self.lock:
+            p = self._estatisticas_prompt(etapa)
+            p['chamadas'] += 1
+            p['prompt_tokens'] += usage.get("prompt_tokens") or 0
+            p['cached_tokens'] += detalhes.get("cached_tokens") or 0
+
+    def _estatisticas_prompt(self, etapa):
+        return self.prompts.setdefault(etapa, {
+            'montagens': 0, 'prefixo': 0, 'dados': 0, 'economizados': 0,
+            'chamadas': 0, 'prompt_tokens': 0, 'cached_tokens': 0
+        })
+
+
+ORCAMENTO = OrcamentoTokens(ORCAMENTO_ARQUIVO)
+
+
+def mostrar_orcamento():
+    """Mostra, por etapa, o orçamento usado e o que se economizou na execução"""
+    with ORCAMENTO.lock:
+        sessao = {etapa: dict(s) for etapa, s in ORCAMENTO.sessao.items()}
+        prompts = {etapa: dict(p) for etapa, p in ORCAMENTO.prompts.items()}
+    if prompts:
+        mostrar_prompts(prompts)
+    if not sessao:
+        return
+    ORCAMENTO.salvar()
+
+    print("\n🎯 ORÇAMENTO DE TOKENS:")
+    for etapa, s in sorted(sessao.items()):
+        padrao = ORCAMENTO.padroes.get(etapa, 0)
+        atual = ORCAMENTO.max_tokens(etapa, padrao) if padrao else 0
+        media_saida = s['tokens_saida'] / s['chamadas']
+        latencia = s['latencia'] / s['chamadas']
+        ms_por_token = s['latencia'] * 1000 / max(s['tokens_saida'], 1)
+        print(f"   {etapa:<12} {s['chamadas']:>4} chamadas | saída média {media_saida:6.0f} tokens | "
+              f"max_tokens {padrao} → {atual}")
+        print(f"   {'':<12} reservados economizados: {s['reservados_economizados']} | "
+              f"paradas no </article>: {s['paradas']} | truncadas: {s['truncadas']} | "
+              f"{latencia:.1f}s por chamada ({ms_por_token:.0f} ms/token)")
+
+
+def mostrar_prompts(prompts):
+    """Tamanho médio dos prompts por etapa e quanto veio do cache de prefixo"""
+    print("\n📨 PROMPTS:")
+    for etapa, p in sorted(prompts.items()):
+        linha = f"   {etapa:<12}"
+        n = p['montagens']
+        if n:
+            linha += (f" {n:>4} prompts | prefixo estático {p['prefixo'] / n:6.0f} + dados {p['dados'] / n:6.0f} tokens"
+                      f" | compactação e corte economizaram {p['economizados']}")
+        if p['prompt_tokens']:
+            linha += (f" | entrada real {p['prompt_tokens'] / p['chamadas']:6.0f} tokens"
+                      f" | cache de prefixo {p['cached_tokens'] / p['prompt_tokens']:.0%}")
+        print(linha)
+
+
+def resumir_cassete(arquivo):
+    """Tokens de entrada/saída e latência por modelo registrados numa cassete"""
+    modelos = defaultdict(lambda: {'prompt': [], 'cached': [], 'saida': [], 'latencia': []})
+    with gzip.open(arquivo, 'rt', encoding='utf-8') as f:
+        for linha in f:
+            if not linha.strip():
+                continue
+            registro = json.loads(linha)
+            usage = (registro.get('resposta') or {}).get('usage') or {}
+            if registro.get('status') != 200 or not usage:
+                continue
+            m = modelos[registro.get('modelo') or '?']
+            m['prompt'].append(usage.get('prompt_tokens') or 0)
+            m['cached'].append((usage.get('prompt_tokens_details') or {}).get('cached_tokens') or 0)
+            m['saida'].append(usage.get('completion_tokens') or 0)
+            m['latencia'].append(registro.get('latencia') or 0)
+    return modelos
+
+
+def comparar_cassetes(base, nova):
+    """Compara duas cassetes gravadas com os mesmos produtos"""
+    resumos = {'base': resumir_cassete(base), 'nova': resumir_cassete(nova)}
+    print(f"📼 base: {base}\n📼 nova: {nova}")
+    for modelo in sorted(set(resumos['base']) | set(resumos['nova'])):
+        print(f"\n🤖 {modelo}")
+        medias = {}
+        for nome, resumo in resumos.items():
+            m = resumo.get(modelo)
+            if not m:
+                print(f"   {nome:<5} sem chamadas")
+                continue
+            prompt = statistics.mean(m['prompt'])
+            cache = sum(m['cached']) / max(sum(m['prompt']), 1)
+            medias[nome] = (prompt, statistics.mean(m['latencia']))
+            print(f"   {nome:<5} {len(m['prompt']):>4} chamadas | entrada {prompt:7.0f} tokens | cache {cache:4.0%} | "
+                  f"saída {statistics.mean(m['saida']):6.0f} tokens | latência {statistics.mean(m['latencia']):5.1f}s")
+        if len(medias) == 2:
+            (p_base, l_base), (p_nova, l_nova) = medias['base'], medias['nova']
+            print(f"   Δ     entrada {p_nova - p_base:+.0f} tokens/chamada | latência {l_nova - l_base:+.1f}s")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        comparar_cassetes(sys.argv[1], sys.argv[2])
+        sys.exit(0)
+
+    # Mostra os orçamentos aprendidos a partir do arquivo
+    print(f"📁 {ORCAMENTO_ARQUIVO}")
+    for etapa, amostras in sorted(ORCAMENTO.amostras.items()):
+        print(f"   {etapa:<12} {len(amostras):>4} amostras | p50 {percentil(amostras, 50):6.0f} | "
+              f"p95 {percentil(amostras, 95):6.0f} | max {max(amostras):6.0f} tokens")
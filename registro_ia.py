@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+REGISTRO DAS CHAMADAS À IA - Uma linha JSON por chamada ao Open Router
+Etapa, slug, modelo, latência, tokens do usage, status, retries e custo.
+Relatório de percentis por etapa:
+
+    python registro_ia.py
+    python registro_ia.py --arquivo outro_registro.jsonl --etapa satelite
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from orcamento_tokens import percentil
+
+# Configurações (sobrescrevíveis pelo .env)
+REGISTRO_ARQUIVO = Path(os.getenv("OPENROUTER_REGISTRO", Path(__file__).parent / "registro_ia.jsonl"))
+REGISTRO_DESATIVADO = os.getenv("OPENROUTER_REGISTRO_DESATIVADO", "").strip().lower() in ("1", "true", "s", "sim")
+
+# Preço por milhão de tokens [entrada, saída] para quando o usage não traz "cost"
+# Ex.: OPENROUTER_PRECOS={"deepseek/deepseek-chat": [0.3, 0.9]}
+try:
+    PRECOS_MODELOS = json.loads(os.getenv("OPENROUTER_PRECOS", "{}"))
+except ValueError:
+    PRECOS_MODELOS = {}
+
+
+def calcular_custo(modelo, usage):
+    """Custo em dólares: o informado pelo provedor ou o da tabela de preços"""
+    if usage.get("cost") is not None:
+        return usage["cost"]
+    preco = PRECOS_MODELOS.get(modelo)
+    if not preco:
+        return None
+    return ((usage.get("prompt_tokens") or 0) * preco[0] + (usage.get("completion_tokens") or 0) * preco[1]) / 1_000_000
+
+
+class RegistroChamadas:
+    """Arquivo JSONL só de acréscimos, compartilhado entre threads"""
+
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self.lock = threading.Lock()
+
+    def anotar(self, etapa, slug, payload, status, latencia, latencia_total=None, retries=0, resultado=None):
+        """Acrescenta o registro de uma chamada (sucesso, falha ou cache)"""
+        if REGISTRO_DESATIVADO:
+            return
+
+        usage = (resultado or {}).get("usage") or {}
+        modelo = (resultado or {}).get("model") or payload.get("model")
+        registro = {
+            'ts': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'etapa': etapa,
+            'slug': slug,
+            'modelo': modelo,
+            'status': status,
+            'latencia': round(latencia, 3),
+            'latencia_total': round(latencia_total if latencia_total is not None else latencia, 3),
+            'retries': retries,
+            'max_tokens': payload.get("max_tokens"),
+            'prompt_tokens': usage.get("prompt_tokens"),
+            'completion_tokens': usage.get("completion_tokens"),
+            'cached_tokens': (usage.get("prompt_tokens_details") or {}).get("cached_tokens"),
+            'custo': calcular_custo(modelo, usage) if usage else None
+        }
+        linha = json.dumps(registro, ensure_ascii=False, separators=(',', ':')) + "\n"
+
+        with self.lock:
+            try:
+                with open(self.arquivo, 'a', encoding='utf-8') as f:
+                    f.write(linha)
+            except OSError as e:
+                print(f"   ⚠️ Erro ao gravar registro da IA: {e}")
+
+
+REGISTRO = RegistroChamadas(REGISTRO_ARQUIVO)
+
+
+def carregar_registros(arquivo, etapa=None):
+    """Lê o JSONL, ignorando linhas corrompidas (ex.: execução interrompida)"""
+    registros = []
+    with open(arquivo, 'r', encoding='utf-8') as f:
+        for linha in f:
+            try:
+                registro = json.loads(linha)
+            except ValueError:
+                continue
+            if etapa is None or registro.get('etapa') == etapa:
+                registros.append(registro)
+    return registros
+
+
+def mostrar_relatorio(registros):
+    """Percentis de latência e tokens por etapa (chamadas ao provedor, sem cache)"""
+    por_etapa = defaultdict(list)
+    for registro in registros:
+        por_etapa[registro.get('etapa') or '-'].append(registro)
+
+    def p(valores):
+        if not valores:
+            return "      -      -      -"
+        return f"{percentil(valores, 50):6.0f} {percentil(valores, 95):6.0f} {percentil(valores, 99):6.0f}"
+
+    print(f"\n{'etapa':<12} {'chamadas':>8} {'cache':>5} {'falhas':>6} {'retries':>7} | "
+          f"{'latência s p50/p95/p99':>22} | {'entrada p50/p95/p99':>20} | {'saída p50/p95/p99':>20} | custo US$")
+    for etapa, lista in sorted(por_etapa.items()):
+        rede = [r for r in lista if r.get('status') != 'cache']
+        ok = [r for r in rede if r.get('status') == 200]
+        latencias = [r['latencia'] for r in ok]
+        entrada = [r['prompt_tokens'] for r in ok if r.get('prompt_tokens') is not None]
+        saida = [r['completion_tokens'] for r in ok if r.get('completion_tokens') is not None]
+        custos = [r['custo'] for r in ok if r.get('custo') is not None]
+
+        lat = (f"{percentil(latencias, 50):6.1f} {percentil(latencias, 95):6.1f} {percentil(latencias, 99):6.1f}"
+               if latencias else "      -      -      -")
+        print(f"{etapa:<12} {len(rede):>8} {len(lista) - len(rede):>5} {len(rede) - len(ok):>6} "
+              f"{sum(r.get('retries') or 0 for r in rede):>7} | {lat:>22} | {p(entrada):>20} | {p(saida):>20} | "
+              f"{sum(custos):.4f}" + ("" if len(custos) == len(ok) else " (parcial)"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relatório de latência, tokens e custo das chamadas à IA")
+    parser.add_argument("--arquivo", default=str(REGISTRO_ARQUIVO), help=f"registro JSONL (padrão: {REGISTRO_ARQUIVO})")
+    parser.add_argument("--etapa", help="só uma etapa (review, preland, sidebar, satelite, refinamento...)")
+    args = parser.parse_args()
+
+    if not Path(args.arquivo).exists():
+        print(f"❌ Registro não encontrado: {args.arquivo}")
+        return
+
+    registros = carregar_registros(args.arquivo, args.etapa)
+    print("=" * 60)
+    print("📒 REGISTRO DAS CHAMADAS À IA")
+    print("=" * 60)
+    print(f"📁 {args.arquivo}: {len(registros)} registros")
+    if registros:
+        print(f"🕐 {registros[0]['ts']} até {registros[-1]['ts']}")
+        mostrar_relatorio(registros)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+RESILIÊNCIA DAS CHAMADAS À IA - Retry com backoff exponencial, disjuntor e hedge
+O disjuntor é compartilhado: quando o provedor degrada, todos os workers pausam
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from limitador_taxa import POOL_CHAVES
+from roteador_modelos import ROTEADOR
+
+# Política de retry (sobrescrevível pelo .env)
+RETRY_MAX = int(os.getenv("OPENROUTER_RETRIES", "4"))
+BACKOFF_BASE = float(os.getenv("OPENROUTER_BACKOFF_BASE", "2"))
+BACKOFF_MAX = float(os.getenv("OPENROUTER_BACKOFF_MAX", "60"))
+
+# Disjuntor: abre após N falhas seguidas e pausa por alguns segundos
+DISJUNTOR_FALHAS = int(os.getenv("OPENROUTER_DISJUNTOR_FALHAS", "5"))
+DISJUNTOR_PAUSA = float(os.getenv("OPENROUTER_DISJUNTOR_PAUSA", "60"))
+
+# Status HTTP que valem nova tentativa
+STATUS_REPETIVEIS = {408, 425, 429, 500, 502, 503, 504}
+
+# Hedge (opcional): chamada mais lenta que o percentil da etapa ganha uma
+# duplicata; no máximo HEDGE_ORCAMENTO das chamadas podem ser duplicadas
+HEDGE_ATIVO = os.getenv("OPENROUTER_HEDGE", "").strip().lower() in ("1", "true", "s", "sim")
+HEDGE_PERCENTIL = float(os.getenv("OPENROUTER_HEDGE_PERCENTIL", "95"))
+HEDGE_ORCAMENTO = float(os.getenv("OPENROUTER_HEDGE_ORCAMENTO", "0.1"))
+HEDGE_AMOSTRAS_MINIMAS = 20
+
+# Janela AIMD de requisições simultâneas: cresce 1 por janela de respostas
+# saudáveis e cai pela metade em 429/5xx (OPENROUTER_AIMD=0 desliga)
+AIMD_ATIVO = os.getenv("OPENROUTER_AIMD", "1").strip().lower() not in ("0", "false", "n", "nao", "não")
+AIMD_INICIAL = float(os.getenv("OPENROUTER_AIMD_INICIAL", "4"))
+AIMD_MAXIMO = float(os.getenv("OPENROUTER_AIMD_MAXIMO", "32"))
+
+_lock_metricas = threading.Lock()
+METRICAS = {
+    'chamadas': 0,
+    'retries': 0,
+    'falhas_definitivas': 0,
+    'disjuntor_aberturas': 0,
+    'segundos_em_pausa': 0.0,
+    'hedges': 0,
+    'hedges_vencedores': 0,
+    'janela_reducoes': 0
+}
+
+
+def registrar_metrica(nome, valor=1):
+    """Incrementa um contador de METRICAS de forma thread-safe"""
+    with _lock_metricas:
+        METRICAS[nome] += valor
+
+
+def calcular_espera(tentativa, retry_after=None):
+    """Backoff exponencial com jitter completo; nunca menor que o Retry-After"""
+    teto = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** tentativa))
+    espera = random.uniform(0, teto)
+    if retry_after:
+        espera = max(espera, retry_after)
+    return espera
+
+
+class Disjuntor:
+    """Circuit breaker compartilhado entre threads
+
+    fechado: chamadas passam normalmente
+    aberto: todas as chamadas aguardam até o fim da pausa
+    meio-aberto: uma única chamada de teste decide se fecha ou reabre; se
+    ela não voltar em `pausa` segundos, outra thread assume o teste
+
+    Resultados de tentativas que começaram antes da abertura (ainda em voo
+    quando o disjuntor abriu) não mudam o estado aberto/meio-aberto.
+    """
+
+    def __init__(self, limite_falhas, pausa):
+        self.limite_falhas = limite_falhas
+        self.pausa = pausa
+        self.falhas_seguidas = 0
+        self.estado = 'fechado'
+        self.aberto_ate = 0.0
+        self.teste_desde = 0.0
+        self.condicao = threading.Condition()
+
+    def aguardar(self):
+        """Bloqueia enquanto o disjuntor estiver aberto ou houver teste em andamento"""
+        with self.condicao:
+            while True:
+                if self.estado == 'fechado':
+                    return
+
+                agora = time.monotonic()
+                if (self.estado == 'aberto' and agora >= self.aberto_ate) or \
+                        (self.estado == 'meio-aberto' and agora - self.teste_desde >= self.pausa):
+                    # Esta thread faz a chamada de teste
+                    self.estado = 'meio-aberto'
+                    self.teste_desde = agora
+                    return
+
+                inicio = time.monotonic()
+                if self.estado == 'aberto':
+                    self.condicao.wait(self.aberto_ate - agora)
+                else:
+                    self.condicao.wait(self.teste_desde + self.pausa - agora)
+                registrar_metrica('segundos_em_pausa', time.monotonic() - inicio)
+
+    def _anterior_a_abertura(self, inicio):
+        return inicio is not None and self.estado != 'fechado' and inicio < self.aberto_ate - self.pausa
+
+    def registrar_sucesso(self, inicio=None):
+        """inicio: monotonic do começo da tentativa"""
+        with self.condicao:
+            if self._anterior_a_abertura(inicio):
+                return
+            self.falhas_seguidas = 0
+            if self.estado != 'fechado':
+                print("   ✅ Disjuntor fechado: provedor respondendo normalmente")
+            self.estado = 'fechado'
+            self.condicao.notify_all()
+
+    def registrar_falha(self, inicio=None):
+        with self.condicao:
+            if self._anterior_a_abertura(inicio):
+                return
+            self.falhas_seguidas += 1
+            if self.estado == 'meio-aberto' or (self.estado == 'fechado' and self.falhas_seguidas >= self.limite_falhas):
+                self.estado = 'aberto'
+                self.aberto_ate = time.monotonic() + self.pausa
+                registrar_metrica('disjuntor_aberturas')
+                print(f"   ⚡ Disjuntor aberto após {self.falhas_seguidas} falhas seguidas: pausando chamadas por {self.pausa:.0f}s")
+            self.condicao.notify_all()
+
+
+DISJUNTOR = Disjuntor(DISJUNTOR_FALHAS, DISJUNTOR_PAUSA)
+
+
+class Hedge:
+    """Limiar de latência por etapa e orçamento de duplicatas
+
+    As latências vêm do registro_ia.jsonl (carregado na primeira consulta)
+    e das chamadas da execução atual.
+    """
+
+    def __init__(self, percentil, orcamento):
+        self.percentil = percentil
+        self.orcamento = orcamento
+        self.lock = threading.Lock()
+        self.latencias = {}
+        self.carregado = False
+        self.chamadas = 0
+        self.duplicadas = 0
+
+    def _carregar_historico(self):
+        from registro_ia import REGISTRO_ARQUIVO, carregar_registros
+        try:
+            registros = carregar_registros(REGISTRO_ARQUIVO)
+        except OSError:
+            registros = []
+        for registro in registros:
+            if registro.get('status') == 200 and registro.get('etapa'):
+                self.latencias.setdefault(registro['etapa'], deque(maxlen=500)).append(registro['latencia'])
+
+    def registrar(self, etapa, latencia):
+        if not etapa:
+            return
+        with self.lock:
+            self.latencias.setdefault(etapa, deque(maxlen=500)).append(latencia)
+
+    def limiar(self, etapa):
+        """Segundos a partir dos quais a chamada da etapa ganha duplicata (ou None)"""
+        from orcamento_tokens import percentil
+        with self.lock:
+            if not self.carregado:
+                self._carregar_historico()
+                self.carregado = True
+            self.chamadas += 1
+            amostras = list(self.latencias.get(etapa, []))
+        if len(amostras) < HEDGE_AMOSTRAS_MINIMAS:
+            return None
+        return percentil(amostras, self.percentil)
+
+    def reservar_duplicata(self):
+        """Consome o orçamento de duplicatas; False quando ele acabou"""
+        with self.lock:
+            if self.duplicadas + 1 > self.orcamento * self.chamadas:
+                return False
+            self.duplicadas += 1
+            return True
+
+
+HEDGE = Hedge(HEDGE_PERCENTIL, HEDGE_ORCAMENTO)
+
+
+class JanelaAIMD:
+    """Limita as requisições em voo com aumento aditivo e redução multiplicativa
+
+    Cada resposta rápida (até 2x a média móvel da etapa) soma 1/janela, ou
+    seja, +1 por janela completa. Um 429/5xx corta a janela pela metade, no
+    máximo uma vez por intervalo de latência típica, para uma rajada de
+    erros não zerar tudo de uma vez. Resposta lenta só segura o crescimento.
+    """
+
+    def __init__(self, inicial, maximo, minimo=1.0):
+        self.janela = max(minimo, min(inicial, maximo))
+        self.minimo = minimo
+        self.maximo = maximo
+        self.em_voo = 0
+        self.menor = self.janela
+        self.maior = self.janela
+        self.media_latencia = {}
+        self.ultima_reducao = 0.0
+        self.condicao = threading.Condition()
+
+    def tentar_entrar(self):
+        """Ocupa uma vaga se houver uma livre agora, sem esperar"""
+        with self.condicao:
+            if self.em_voo >= int(self.janela):
+                return False
+            self.em_voo += 1
+            return True
+
+    def entrar(self):
+        """Bloqueia até haver vaga na janela"""
+        with self.condicao:
+            while self.em_voo >= int(self.janela):
+                self.condicao.wait()
+            self.em_voo += 1
+
+    def sair(self, etapa, latencia, status):
+        """Libera a vaga e ajusta a janela pelo resultado da requisição"""
+        with self.condicao:
+            self.em_voo -= 1
+            agora = time.monotonic()
+            media = self.media_latencia.get(etapa)
+
+            if status == 429 or (isinstance(status, int) and status >= 500):
+                intervalo = media or 5.0
+                if agora - self.ultima_reducao >= intervalo:
+                    self.janela = max(self.minimo, self.janela / 2)
+                    self.ultima_reducao = agora
+                    registrar_metrica('janela_reducoes')
+                    print(f"   📉 Janela de requisições reduzida para {int(self.janela)} (HTTP {status})")
+            elif status == 200:
+                if media is None or latencia <= 2 * media:
+                    self.janela = min(self.maximo, self.janela + 1 / self.janela)
+                self.media_latencia[etapa] = latencia if media is None else 0.8 * media + 0.2 * latencia
+
+            self.menor = min(self.menor, self.janela)
+            self.maior = max(self.maior, self.janela)
+            self.condicao.notify_all()
+
+    def resumo(self):
+        """Texto curto com a janela atual e as requisições em voo"""
+        return f"janela {int(self.janela)} ({self.em_voo} em voo)"
+
+
+JANELA = JanelaAIMD(AIMD_INICIAL, AIMD_MAXIMO) if AIMD_ATIVO else None
+
+
+def workers_para_janela(padrao):
+    """Padrão de workers quando o usuário não configurou nenhum
+
+    Grande o bastante para a janela AIMD (e não o pool) limitar as
+    requisições; valor configurado pelo usuário deve ser usado como está.
+    """
+    return max(padrao, int(AIMD_MAXIMO)) if JANELA else padrao
+
+
+def resumo_janela():
+    """Janela AIMD para as linhas de progresso ('' se desligada)"""
+    return f" | {JANELA.resumo()}" if JANELA else ""
+
+
+def mostrar_metricas():
+    """Mostra o resumo de retries e disjuntor da execução"""
+    with _lock_metricas:
+        m = dict(METRICAS)
+
+    if not m['chamadas']:
+        return
+
+    print(f"\n🔁 CHAMADAS À IA: {m['chamadas']}")
+    print(f"   Retries: {m['retries']}")
+    print(f"   Falhas definitivas: {m['falhas_definitivas']}")
+    print(f"   Disjuntor aberto: {m['disjuntor_aberturas']}x ({m['segundos_em_pausa']:.0f}s de pausa somada entre workers)")
+    if JANELA:
+        print(f"   Janela AIMD: {int(JANELA.janela)} agora, entre {int(JANELA.menor)} e {int(JANELA.maior)}"
+              f" ({m['janela_reducoes']} reduções)")
+    POOL_CHAVES.mostrar()
+    ROTEADOR.mostrar()
+    if m['hedges']:
+        print(f"   Duplicatas (hedge): {m['hedges']} ({m['hedges_vencedores']} chegaram antes da original)")
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+ROTEADOR DE MODELOS - Lista ordenada de modelos por tipo de tarefa
+Cada modelo da rota tem seu timeout; quando o primeiro fica lento ou começa
+a falhar (pelas últimas chamadas), as chamadas passam para o seguinte
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+from orcamento_tokens import percentil
+
+# Rota de cada tarefa: [modelo, timeout em segundos], na ordem de preferência.
+# Tarefas leves vão primeiro para modelos baratos e rápidos.
+ROTAS_PADRAO = {
+    'review': [["deepseek/deepseek-chat", 180], ["google/gemini-2.0-flash-001", 120]],
+    'preland': [["deepseek/deepseek-chat", 180], ["google/gemini-2.0-flash-001", 120]],
+    'satelite': [["deepseek/deepseek-chat", 300], ["google/gemini-2.0-flash-001", 180]],
+    'refinamento': [["deepseek/deepseek-chat", 180], ["google/gemini-2.0-flash-001", 120]],
+    'sidebar': [["google/gemini-2.0-flash-001", 30], ["openai/gpt-4o-mini", 30], ["deepseek/deepseek-chat", 60]],
+}
+
+# Etapas do registro que pertencem a cada tarefa; meta (até 300 tokens) é leve
+# como a sidebar. Etapa sem tarefa mantém o modelo do payload.
+TAREFA_POR_ETAPA = {
+    'esboco': 'review',
+    'introducao': 'review',
+    'secao': 'review',
+    'refinamento_secao': 'refinamento',
+    'edicoes': 'refinamento',
+    'meta': 'sidebar',
+}
+
+# Ex.: OPENROUTER_ROTAS={"sidebar": [["openai/gpt-4o-mini", 20]]}
+# (OPENROUTER_ROTEADOR=0 desliga e usa sempre o modelo do payload)
+ROTEADOR_ATIVO = os.getenv("OPENROUTER_ROTEADOR", "1").strip().lower() not in ("0", "false", "n", "nao", "não")
+try:
+    ROTAS = dict(ROTAS_PADRAO, **json.loads(os.getenv("OPENROUTER_ROTAS", "{}")))
+except ValueError:
+    print("⚠️ OPENROUTER_ROTAS inválido; usando as rotas padrão")
+    ROTAS = dict(ROTAS_PADRAO)
+
+# Estatística de cada modelo: últimas N chamadas da tarefa. O modelo sai da
+# frente quando metade delas falhou ou quando o p90 de latência passa de
+# ROTA_LIMIAR_LENTO do timeout, e volta a ser tentado após ROTA_PAUSA segundos.
+ROTA_JANELA = int(os.getenv("OPENROUTER_ROTA_JANELA", "20"))
+ROTA_AMOSTRAS_MINIMAS = 5
+ROTA_LIMIAR_LENTO = float(os.getenv("OPENROUTER_ROTA_LIMIAR_LENTO", "0.8"))
+ROTA_PAUSA = float(os.getenv("OPENROUTER_ROTA_PAUSA", "120"))
+
+
+class RoteadorModelos:
+    """Escolhe o modelo de cada tentativa, compartilhado entre threads"""
+
+    def __init__(self, rotas):
+        self.rotas = rotas
+        self.lock = threading.Lock()
+        self.janelas = defaultdict(lambda: deque(maxlen=ROTA_JANELA))
+        self.pausado_ate = {}
+        self.stats = defaultdict(lambda: {'chamadas': 0, 'erros': 0, 'desvios': 0})
+
+    def tarefa(self, etapa):
+        """Tarefa da rota usada pela etapa (None quando não há rota)"""
+        if not ROTEADOR_ATIVO or not etapa:
+            return None
+        tarefa = TAREFA_POR_ETAPA.get(etapa, etapa)
+        return tarefa if self.rotas.get(tarefa) else None
+
+    def escolher(self, etapa, evitar=None, gravado=None):
+        """(modelo, timeout) da tentativa; None quando a etapa não tem rota
+
+        evitar é o modelo que acabou de falhar: se houver outro disponível,
+        a nova tentativa vai para ele. Na reprodução de uma cassete,
+        gravado(modelo) diz se aquele modelo foi gravado para a chamada; a
+        rota fica fixa e as estatísticas de latência não contam.
+        """
+        tarefa = self.tarefa(etapa)
+        if tarefa is None:
+            return None
+
+        rota = self.rotas[tarefa]
+        agora = time.monotonic()
+        if gravado is not None:
+            disponiveis = [(m, t) for m, t in rota if gravado(m)]
+        else:
+            with self.lock:
+                disponiveis = [(m, t) for m, t in rota if self.pausado_ate.get((tarefa, m), 0) <= agora]
+        candidatos = [(m, t) for m, t in disponiveis if m != evitar] or disponiveis or rota[:1]
+        modelo, timeout = candidatos[0]
+
+        if modelo != rota[0][0]:
+            with self.lock:
+                self.stats[(tarefa, modelo)]['desvios'] += 1
+        return modelo, timeout
+
+    def registrar(self, etapa, modelo, latencia, ok):
+        """Resultado de uma tentativa; pode tirar o modelo da frente por um tempo"""
+        tarefa = self.tarefa(etapa)
+        if tarefa is None:
+            return
+
+        rota = self.rotas[tarefa]
+        timeout = next((t for m, t in rota if m == modelo), None)
+        if timeout is None:
+            return
+
+        chave = (tarefa, modelo)
+        with self.lock:
+            self.stats[chave]['chamadas'] += 1
+            if not ok:
+                self.stats[chave]['erros'] += 1
+
+            janela = self.janelas[chave]
+            janela.append((latencia, ok))
+            if len(janela) < ROTA_AMOSTRAS_MINIMAS or len(rota) < 2:
+                return
+
+            erros = sum(1 for _, sucesso in janela if not sucesso)
+            latencias = [lat for lat, sucesso in janela if sucesso]
+            if erros * 2 >= len(janela):
+                motivo = f"{erros}/{len(janela)} falhas"
+            elif len(latencias) >= ROTA_AMOSTRAS_MINIMAS and percentil(latencias, 90) > timeout * ROTA_LIMIAR_LENTO:
+                motivo = f"p90 de {percentil(latencias, 90):.0f}s (timeout {timeout}s)"
+            else:
+                return
+
+            self.pausado_ate[chave] = time.monotonic() + ROTA_PAUSA
+            janela.clear()
+        print(f"   🔀 {modelo} em {tarefa}: {motivo}; fora da frente por {ROTA_PAUSA:.0f}s")
+
+    def descrever(self, etapa):
+        """Rota da etapa em uma linha (None quando não há rota)"""
+        tarefa = self.tarefa(etapa)
+        if tarefa is None:
+            return None
+        return " → ".join(f"{m} ({t}s)" for m, t in self.rotas[tarefa])
+
+    def mostrar(self):
+        """Chamadas, erros e desvios por tarefa e modelo"""
+        with self.lock:
+            stats = {chave: dict(valor) for chave, valor in self.stats.items()}
+        if not stats:
+            return
+        print("\n🔀 MODELOS POR TAREFA:")
+        for (tarefa, modelo), s in sorted(stats.items()):
+            desvios = f" | {s['desvios']} por fallback" if s['desvios'] else ""
+            print(f"   {tarefa:<12} {modelo:<32} {s['chamadas']:>5} tentativas | erros {s['erros']}{desvios}")
+
+
+ROTEADOR = RoteadorModelos(ROTAS)
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+SERVIDOR MOCK DO OPEN ROUTER - Teste de carga offline, sem gastar tokens
+Fala o protocolo chat/completions (normal e streaming SSE) com latência
+e erros injetados. Para usar com os geradores:
+
+    python servidor_mock.py --p50 2 --p99 20 --taxa-429 0.05
+    OPENROUTER_BASE_URL=http://127.0.0.1:8787/api/v1 python gerador.py
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SECOES_ARTIGO = [
+    "Introdução",
+    "Especificações na Prática",
+    "Testes e Uso Real",
+    "Prós e Contras",
+    "Comparação com Alternativas",
+    "Para Quem Vale a Pena",
+    "Perguntas Frequentes",
+    "Conclusão",
+]
+
+PARAGRAFO = (
+    "<p>Este é um parágrafo de exemplo gerado pelo servidor mock. Ele tem o tamanho "
+    "aproximado de um parágrafo real para que o tempo de escrita em disco, a extração "
+    "por regex e o streaming sejam medidos com volumes parecidos com os de produção.</p>"
+)
+
+SIDEBAR = """<div class="widget">
+    <h3><i class="fas fa-star"></i> Destaque</h3>
+    <p><strong>{{PRODUTO}}</strong></p>
+    <p>Oferta especial por tempo limitado disponível</p>
+    <a href="{{LINK_AFILIADO}}" class="btn-sidebar" target="_blank" rel="nofollow sponsored">Saiba Mais</a>
+</div>"""
+
+
+def criar_artigo(paragrafos_por_secao=4):
+    """Resposta no formato TITLE/DESCRIPTION/ARTICLE usado pelos geradores"""
+    secoes = []
+    for titulo in SECOES_ARTIGO:
+        secoes.append(f"<h2>{titulo}</h2>\n" + "\n".join([PARAGRAFO] * paragrafos_por_secao))
+
+    corpo = "\n\n".join(secoes)
+    return f"""TITLE:
+Produto Mock Vale a Pena? Análise Completa
+
+DESCRIPTION:
+Análise completa do produto mock com testes, prós e contras. Leia nosso review.
+
+ARTICLE:
+<article class="content">
+{corpo}
+<div class="cta-final">
+    <h3>Quer Saber Todos os Detalhes?</h3>
+    <p><a href="LINK_REVIEW" class="btn-review">Leia nosso Review Completo</a></p>
+</div>
+</article>"""
+
+
+class ConfigMock:
+    """Parâmetros de latência e falhas, compartilhados entre as threads do servidor"""
+
+    def __init__(self, args):
+        self.p50 = args.p50
+        self.p99 = max(args.p99, args.p50)
+        self.taxa_429 = args.taxa_429
+        self.taxa_5xx = args.taxa_5xx
+        self.retry_after = args.retry_after
+        self.tokens_por_segundo = args.tokens_por_segundo
+        self.paragrafos = args.paragrafos
+
+        # Lognormal com mediana p50 e percentil 99 em p99 (z(0.99) = 2.326)
+        self.mu = math.log(self.p50) if self.p50 > 0 else None
+        self.sigma = (math.log(self.p99) - math.log(self.p50)) / 2.326 if self.p50 > 0 else 0
+
+        self.lock = threading.Lock()
+        self.contadores = {'requisicoes': 0, 'ok': 0, '429': 0, '5xx': 0}
+
+    def sortear_latencia(self):
+        if self.mu is None:
+            return 0.0
+        return random.lognormvariate(self.mu, self.sigma)
+
+    def contar(self, chave):
+        with self.lock:
+            self.contadores[chave] += 1
+
+
+class ManipuladorMock(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None
+
+    def log_message(self, formato, *args):
+        # Silencia o log por requisição; o resumo sai ao encerrar
+        pass
+
+    def _responder_json(self, status, corpo, cabecalhos=None):
+        dados = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._responder_json(200, {"data": [{"id": "deepseek/deepseek-chat"}]})
+        else:
+            self._responder_json(404, {"error": {"code": 404, "message": "not found"}})
+
+    def do_POST(self):
+        tamanho = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(tamanho) or b"{}")
+        except ValueError:
+            self._responder_json(400, {"error": {"code": 400, "message": "invalid json"}})
+            return
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._responder_json(404, {"error": {"code": 404, "message": "not found"}})
+            return
+
+        config = self.config
+        config.contar('requisicoes')
+
+        # Erros injetados saem rápido, como no provedor real
+        sorteio = random.random()
+        if sorteio < config.taxa_429:
+            config.contar('429')
+            self._responder_json(429, {"error": {"code": 429, "message": "rate limited (mock)"}},
+                                 {"Retry-After": str(config.retry_after)})
+            return
+        if sorteio < config.taxa_429 + config.taxa_5xx:
+            config.contar('5xx')
+            status = random.choice([500, 502, 503])
+            self._responder_json(status, {"error": {"code": status, "message": "upstream error (mock)"}})
+            return
+
+        conteudo = self.gerar_conteudo(payload)
+        prompt_tokens = sum(len(m.get("content") or "") for m in payload.get("messages", [])) // 4
+        completion_tokens = len(conteudo) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+        modelo = payload.get("model", "mock")
+
+        # Latência até o primeiro byte
+        time.sleep(config.sortear_latencia())
+
+        if payload.get("stream"):
+            self.enviar_streaming(conteudo, modelo, usage)
+        else:
+            self._responder_json(200, {
+                "id": f"gen-mock-{uuid.uuid4().hex[:12]}",
+                "model": modelo,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": conteudo},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            })
+        config.contar('ok')
+
+    def gerar_conteudo(self, payload):
+        """Escolhe a resposta enlatada pelo tipo de chamada"""
+        # Sidebars pedem no máximo 1000 tokens
+        if payload.get("max_tokens", 4000) <= 1000:
+            return SIDEBAR
+        return criar_artigo(self.config.paragrafos)
+
+    def enviar_streaming(self, conteudo, modelo, usage):
+        """Envia o conteúdo em eventos SSE no ritmo de tokens_por_segundo"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        id_geracao = f"gen-mock-{uuid.uuid4().hex[:12]}"
+        tamanho_pedaco = 16
+        pausa = (tamanho_pedaco / 4) / self.config.tokens_por_segundo if self.config.tokens_por_segundo > 0 else 0
+
+        def evento(dados):
+            self.wfile.write(f"data: {json.dumps(dados, ensure_ascii=False)}\n\n".encode('utf-8'))
+
+        try:
+            self.wfile.write(b": OPENROUTER PROCESSING\n\n")
+            for inicio in range(0, len(conteudo), tamanho_pedaco):
+                evento({
+                    "id": id_geracao,
+                    "model": modelo,
+                    "choices": [{"index": 0, "delta": {"content": conteudo[inicio:inicio + tamanho_pedaco]}, "finish_reason": None}]
+                })
+                if pausa:
+                    time.sleep(pausa)
+            evento({
+                "id": id_geracao,
+                "model": modelo,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "usage": usage
+            })
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # O cliente parou de ler (ex.: já recebeu o </article>)
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita o chat/completions do Open Router")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8787)
+    parser.add_argument("--p50", type=float, default=2.0, help="latência mediana em segundos (padrão: 2)")
+    parser.add_argument("--p99", type=float, default=10.0, help="latência do percentil 99 em segundos (padrão: 10)")
+    parser.add_argument("--taxa-429", type=float, default=0.0, help="fração de respostas 429 (ex.: 0.05)")
+    parser.add_argument("--taxa-5xx", type=float, default=0.0, help="fração de respostas 500/502/503")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After enviado nos 429 (segundos)")
+    parser.add_argument("--tokens-por-segundo", type=float, default=200.0, help="ritmo do streaming (0 = sem pausa)")
+    parser.add_argument("--paragrafos", type=int, default=4, help="parágrafos por seção do artigo enlatado")
+    args = parser.parse_args()
+
+    ManipuladorMock.config = ConfigMock(args)
+    servidor = ThreadingHTTPServer((args.host, args.porta), ManipuladorMock)
+    servidor.daemon_threads = True
+
+    print("=" * 60)
+    print("🧪 SERVIDOR MOCK DO OPEN ROUTER")
+    print("=" * 60)
+    print(f"🌐 Escutando em http://{args.host}:{args.porta}")
+    print(f"⏱️  Latência p50={args.p50}s p99={args.p99}s")
+    print(f"💥 Erros: 429={args.taxa_429:.0%} 5xx={args.taxa_5xx:.0%}")
+    print("\n💡 Nos geradores, use no .env ou no ambiente:")
+    print(f"   OPENROUTER_BASE_URL=http://{args.host}:{args.porta}/api/v1")
+    print("   OPENROUTER_API_KEY=mock")
+    print("   CACHE_IA_DESATIVADO=1")
+
+    inicio = time.monotonic()
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+    duracao = time.monotonic() - inicio
+    c = ManipuladorMock.config.contadores
+    print(f"\n📊 {c['requisicoes']} requisições em {duracao:.0f}s ({c['requisicoes'] / max(duracao, 1) * 60:.1f}/min)")
+    print(f"   OK: {c['ok']} | 429: {c['429']} | 5xx: {c['5xx']}")
+
+
+if __name__ == "__main__":
+    main()